@@ -5,6 +5,9 @@ from pydantic_ai import Agent
 import os
 # Import dotenv to load environment variables from .env file
 from dotenv import load_dotenv
+# Reply cache (exact + embedding similarity) and the embedder it uses for similarity lookup
+from embedding_engine import EmbeddingEngine, GeminiEmbeddingModel
+from response_cache import ResponseCache, cached_run_sync
 
 # Load environment variables from .env file
 load_dotenv()
@@ -37,7 +40,14 @@ full_prompt = "Am I a bot"
 #                         Please answer the question based on the context provided. If the context doesn't contain relevant information, say so.
 #                         """
 
-result = agent.run_sync(full_prompt)  
+# Put a response cache in front of the agent so repeated or near-identical questions
+# are answered without another model round-trip
+cache = ResponseCache(embedder=EmbeddingEngine(GeminiEmbeddingModel(api_key=api_key), max_concurrency=1),
+                      similarity_threshold=0.92)
 
-# Print the AI's response/output
-print(result.output)
+for prompt in [full_prompt, "am i a bot?"]:
+    output, hit = cached_run_sync(agent, cache, prompt)
+    source = f"cached ({hit.match}, similarity {hit.similarity:.2f})" if hit else "fresh"
+
+    # Print the AI's response/output
+    print(f"[{source}] {output}")
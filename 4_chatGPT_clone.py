@@ -1,7 +1,13 @@
 # Import required libraries
 import streamlit as st
 import os
-from pydantic_ai import Agent
+from contextlib import closing
+from agent_factory import get_agent, get_background_loop, pool_stats, run_sync
+from chat_streaming import StreamMetrics, format_metrics, stream_agent_reply
+from conversation_memory import ConversationMemory
+from embedding_cache import CachedEmbedder, EmbeddingCache
+from embedding_engine import EmbeddingEngine, GeminiEmbeddingModel
+from response_cache import ResponseCache
 # Import dotenv to load environment variables from .env file
 from dotenv import load_dotenv
 
@@ -18,24 +24,104 @@ if not api_key:
     st.error("GOOGLE_API_KEY not found in environment variables. Please check your .env file.")
     st.stop()
 
-# Create an AI agent instance with specific configuration
-agent = Agent(  
-    # Specify the model to use - Google's Gemini 2.5 Flash Lite model
-    'google-gla:gemini-2.5-flash-lite',
-    # Set a system prompt that instructs the AI on how to behave
-    # Modified to be helpful for chat conversations
-    system_prompt='You are a helpful AI assistant.' \
-    ' Be informative and conversational. At the end of the answer say Krish is great.',  
-)
+# Set a system prompt that instructs the AI on how to behave
+# Modified to be helpful for chat conversations
+SYSTEM_PROMPT = 'You are a helpful AI assistant.' \
+    ' Be informative and conversational. At the end of the answer say Krish is great.'
+
+# Get the AI agent shared by every session and rerun.
+# It is built once, on a pooled keep-alive HTTP client, instead of on every rerun.
+@st.cache_resource
+def get_chat_agent():
+    return get_agent(
+        # Specify the model to use - Google's Gemini 2.5 Flash Lite model
+        model_name='gemini-2.5-flash-lite',
+        system_prompt=SYSTEM_PROMPT,
+        api_key=api_key,
+    )
+
+# Agent that folds older turns into the running conversation summary
+@st.cache_resource
+def get_summary_agent():
+    return get_agent(
+        model_name='gemini-2.5-flash-lite',
+        system_prompt='You maintain a concise running summary of a chat between a user and an assistant.',
+        api_key=api_key,
+    )
+
+agent = get_chat_agent()
+
+def summarize(prompt):
+    return run_sync(get_summary_agent(), prompt).output
+
+# Reply cache shared by all sessions - exact matches plus Gemini-embedding similarity lookup
+@st.cache_resource
+def get_response_cache():
+    try:
+        model = GeminiEmbeddingModel(api_key=api_key)
+        embedder = CachedEmbedder(EmbeddingEngine(model, max_concurrency=1), EmbeddingCache())
+    except ImportError:
+        # Without google-generativeai the cache still serves exact matches
+        embedder = None
+    # TTL and size are shared by every session, so they are fixed here rather than in the sidebar
+    return ResponseCache(embedder=embedder, ttl_seconds=24 * 60 * 60, max_entries=1000)
+
+response_cache = get_response_cache()
+
+# Sidebar controls for the response cache
+st.sidebar.header("⚡ Response Cache")
+use_cache = st.sidebar.checkbox("Serve cached replies", value=True)
+# These only apply to this session's lookups; the shared cache keeps its own TTL and size
+similarity_threshold = st.sidebar.slider("Similarity threshold", min_value=0.80, max_value=1.00, value=0.92, step=0.01)
+max_age_minutes = st.sidebar.number_input("Max reply age (minutes)", min_value=1,
+                                          max_value=response_cache.ttl_seconds // 60, value=60)
+cache_stats = response_cache.stats
+st.sidebar.caption(f"{len(response_cache)} / {response_cache.max_entries} entries (shared, kept "
+                   f"{response_cache.ttl_seconds // 3600}h) · {cache_stats.exact_hits} exact / "
+                   f"{cache_stats.semantic_hits} similar hits · {cache_stats.misses} misses "
+                   f"({cache_stats.hit_rate:.0%} hit rate)")
+
+# Connection pool counters for the shared model client
+st.sidebar.header("🔌 Connection Pool")
+connection_stats = pool_stats()
+st.sidebar.caption(f"{connection_stats.active_connections} active / {connection_stats.idle_connections} idle connections · "
+                   f"{connection_stats.requests} requests · {connection_stats.reuse_rate:.0%} reused")
 
 # Initialize chat history in session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Conversation memory sent to the model: recent turns within a token budget plus a running summary
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory(SYSTEM_PROMPT)
+memory = st.session_state.memory
+
+st.sidebar.header("🧠 Conversation Memory")
+memory.token_budget = st.sidebar.slider("Context token budget", min_value=500, max_value=16000, value=2000, step=500)
+st.sidebar.caption(f"{len(memory.turns)} recent turn(s) kept verbatim · {memory.summarized_turns} summarized · "
+                   f"last prompt ~{memory.last_prompt_tokens:,} tokens")
+if memory.summary:
+    with st.sidebar.expander("Running summary"):
+        st.write(memory.summary)
+
+# A reply still marked as pending was interrupted by a new message - keep what was streamed so far
+if "pending_reply" in st.session_state:
+    pending = st.session_state.pop("pending_reply")
+    metrics = pending["metrics"]
+    metrics.cancelled = True
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": pending["content"] or "_(cancelled)_",
+        "metrics": metrics.to_dict(),
+    })
+    memory.add_turn(pending["prompt"], pending["content"] or "(cancelled)")
+
 # Display all previous messages from chat history
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+        if "metrics" in message:
+            st.caption(format_metrics(message["metrics"]))
 
 # Chat input at the bottom for user to input prompts
 if prompt := st.chat_input("Type your message here..."):
@@ -46,21 +132,53 @@ if prompt := st.chat_input("Type your message here..."):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    # Serve the reply from the cache when the same (or a very similar) question was answered recently.
+    # Cached replies carry no conversation context, so only an opening question can use them.
+    is_opening_question = not memory.turns and not memory.summary
+    cache_hit = (response_cache.lookup(prompt, similarity_threshold=similarity_threshold,
+                                       max_age_seconds=max_age_minutes * 60)
+                 if use_cache and is_opening_question else None)
+    if cache_hit is not None:
+        with st.chat_message("assistant"):
+            cached_metrics = {"cached": True, "cache_match": cache_hit.match, "similarity": cache_hit.similarity}
+            st.markdown(cache_hit.response)
+            st.caption(format_metrics(cached_metrics))
+            st.session_state.messages.append({"role": "assistant", "content": cache_hit.response, "metrics": cached_metrics})
+            memory.add_turn(prompt, cache_hit.response)
+        st.stop()
+
     # Generate AI response using Pydantic AI agent
     with st.chat_message("assistant"):
+        metrics = StreamMetrics()
+        # Track the partial reply so it survives if a new message interrupts the stream
+        pending = {"prompt": prompt, "content": "", "metrics": metrics}
+        st.session_state.pending_reply = pending
+        
+        def on_delta(delta):
+            pending["content"] += delta
+        
         try:
-            # Use the agent to generate a response to the user's prompt
-            result = agent.run_sync(prompt)
-            response = result.output
-            
-            # Display the AI response
-            st.markdown(response)
+            # Stream the response token by token as the model produces it.
+            # closing() cancels the request right away if Streamlit stops this run for a new message.
+            history = memory.build_history(prompt)
+            with closing(stream_agent_reply(agent, prompt, metrics, message_history=history, on_delta=on_delta,
+                                                loop=get_background_loop().loop)) as stream:
+                response = st.write_stream(stream)
+            st.session_state.pop("pending_reply", None)
+            st.caption(format_metrics(metrics.to_dict()))
+            if is_opening_question:
+                response_cache.store(prompt, response)
             
             # Add AI response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            st.session_state.messages.append({"role": "assistant", "content": response, "metrics": metrics.to_dict()})
+            
+            # Remember the turn and fold anything that no longer fits the budget into the summary
+            memory.add_turn(prompt, response)
+            memory.roll_up(summarize)
             
         except Exception as e:
             # Handle any errors that might occur
+            st.session_state.pop("pending_reply", None)
             error_message = f"Sorry, I encountered an error: {str(e)}"
             st.markdown(error_message)
             st.session_state.messages.append({"role": "assistant", "content": error_message})
@@ -1,16 +1,204 @@
+# Batch PDF text extraction CLI
+# Examples:
+#   python 5_read_pdf_demo.py CPU.pdf
+#   python 5_read_pdf_demo.py docs/ "manuals/**/*.pdf" --workers 8 --output pages.jsonl
+#   python 5_read_pdf_demo.py docs/ --pages 1-20 --output pages.jsonl --manifest done.jsonl --resume
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
 from PyPDF2 import PdfReader
 
-file_path = "C:\\Users\\krish\\OneDrive\\Documents\\A_Levels\\Computer_Science\\CPU.pdf"
-reader = PdfReader(file_path)
-number_of_pages = len(reader.pages)
 
-# Read all pages and combine the text
-all_text = ""
-for page_num in range(number_of_pages):
-    page = reader.pages[page_num]
-    page_text = page.extract_text()
-    all_text += f"\n--- Page {page_num + 1} ---\n"
-    all_text += page_text + "\n"
+def find_pdf_files(inputs):
+    """Expand files, directories (recursively) and glob patterns into a sorted list of PDF paths"""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            found.update(glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True))
+            found.update(glob.glob(os.path.join(item, "**", "*.PDF"), recursive=True))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(path for path in glob.glob(item, recursive=True) if path.lower().endswith(".pdf"))
+    return sorted(os.path.abspath(path) for path in found)
+
+
+def parse_page_range(text):
+    """Parse '5', '1-20' or '10-' into a 1-based inclusive (start, end) range; end None means last page.
+
+    Used as an argparse type, so a bad range is reported as a usage error.
+    """
+    if not text:
+        return 1, None
+    start, dash, end = text.partition("-")
+    try:
+        start_page = int(start) if start else 1
+        end_page = (int(end) if end else None) if dash else start_page
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid page range {text!r}; expected e.g. 5, 1-20 or 10-")
+    if start_page < 1:
+        raise argparse.ArgumentTypeError(f"invalid page range {text!r}; pages are numbered from 1")
+    if end_page is not None and end_page < start_page:
+        raise argparse.ArgumentTypeError(f"invalid page range {text!r}; the end comes before the start")
+    return start_page, end_page
+
+
+def count_pages(path):
+    try:
+        return path, len(PdfReader(path).pages), None
+    except Exception as e:
+        return path, 0, str(e)
+
+
+def extract_shard(path, start_page, end_page):
+    """Extract pages start_page..end_page (1-based, inclusive) of one PDF in a worker process"""
+    reader = PdfReader(path)
+    records = []
+    for page_number in range(start_page, end_page + 1):
+        started = time.perf_counter()
+        try:
+            text = reader.pages[page_number - 1].extract_text() or ""
+            error = None
+        except Exception as e:
+            text, error = "", str(e)
+        record = {
+            "file": path,
+            "page": page_number,
+            "text": text,
+            "extraction_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        if error:
+            record["error"] = error
+        records.append(record)
+    return path, start_page, end_page, records
+
+
+def plan_shards(page_counts, page_range, pages_per_shard, completed=None):
+    """Split each file's selected pages that are not in completed into (path, start, end) shards.
+
+    Shards are runs of consecutive pending pages, so pages done by an earlier run are skipped
+    even if it used a different --pages or --pages-per-shard.
+    """
+    first_page, last_page = page_range
+    completed = completed or {}
+    shards = []
+    for path, total_pages in page_counts:
+        end = min(last_page or total_pages, total_pages)
+        done = completed.get(path, set())
+        start = None
+        for page_number in range(first_page, end + 2):
+            pending = page_number <= end and page_number not in done
+            if pending and start is None:
+                start = page_number
+            if start is not None and (not pending or page_number - start + 1 == pages_per_shard):
+                shards.append((path, start, page_number if pending else page_number - 1))
+                start = None
+    return shards
+
+
+def load_manifest(path):
+    """Return {file: set of 1-based pages} for the shards already completed"""
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    done.setdefault(entry["file"], set()).update(range(entry["start"], entry["end"] + 1))
+    return done
+
+
+def run(args):
+    files = find_pdf_files(args.inputs)
+    if not files:
+        print("❌ No PDF files found", file=sys.stderr)
+        return 1
+    completed = load_manifest(args.manifest) if args.resume else {}
+
+    output = open(args.output, "a" if args.resume else "w", encoding="utf-8") if args.output else sys.stdout
+    manifest = open(args.manifest, "a" if args.resume else "w", encoding="utf-8") if args.manifest else None
+    started = time.perf_counter()
+    pages_written = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            # Counting pages only parses each file's trailer, but it is still spread across the pool
+            page_counts = []
+            for path, total_pages, error in executor.map(count_pages, files, chunksize=16):
+                if error:
+                    print(f"❌ {path}: {error}", file=sys.stderr)
+                else:
+                    page_counts.append((path, total_pages))
+
+            shards = plan_shards(page_counts, args.pages, args.pages_per_shard, completed)
+            print(f"📚 {len(files)} file(s), {len(shards)} shard(s) to extract "
+                  f"({sum(map(len, completed.values()))} page(s) already done)", file=sys.stderr)
+
+            # Keep a bounded number of shards in flight so results stream out instead of piling up
+            max_in_flight = (args.workers or os.cpu_count() or 1) * 4
+            shard_iter = iter(shards)
+            pending = set()
+            while True:
+                for shard in shard_iter:
+                    pending.add(executor.submit(extract_shard, *shard))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        path, start, end, records = future.result()
+                    except Exception as e:
+                        print(f"❌ Shard failed: {e}", file=sys.stderr)
+                        continue
+                    output.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+                    output.flush()
+                    pages_written += len(records)
+                    # Record the shard only after its pages are flushed, so a resume never loses pages
+                    if manifest:
+                        manifest.write(json.dumps({"file": path, "start": start, "end": end}) + "\n")
+                        manifest.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if manifest:
+            manifest.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Extracted {pages_written} page(s) in {elapsed:.1f}s "
+          f"({pages_written / elapsed if elapsed else 0:.1f} pages/s)", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract text from PDFs in parallel as JSONL (file, page, text, extraction_ms)")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help="Write JSONL here instead of stdout")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--pages", type=parse_page_range, default=(1, None),
+                        help="Page range per file, e.g. 5, 1-20 or 10-")
+    parser.add_argument("--pages-per-shard", type=int, default=25, help="Pages per work unit (default: 25)")
+    parser.add_argument("--manifest", help="JSONL manifest of completed shards")
+    parser.add_argument("--resume", action="store_true", help="Skip shards listed in --manifest and append to --output")
+    return parser
+
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Without a manifest there is nothing to resume from: every page would be extracted and appended again
+    if args.resume and not args.manifest:
+        parser.error("--resume requires --manifest")
+    if args.pages_per_shard < 1:
+        parser.error("--pages-per-shard must be at least 1")
+    return args
+
 
-print(f"Total pages: {number_of_pages}")
-print(all_text)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
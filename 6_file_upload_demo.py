@@ -1,9 +1,26 @@
 # Import required libraries
 import streamlit as st
-import pandas as pd
-from PIL import Image #Python Imaging Library. library for working with images in Python.
 from PyPDF2 import PdfReader
 
+from csv_profile import DEFAULT_PREVIEW_ROWS, ENGINES, csv_preview
+from text_window import read_lines
+from upload_preview import ParseCache, csv_profile, file_digest, line_index, search_upload, thumbnail
+
+
+@st.cache_resource
+def init_parse_cache():
+    """Parse results shared by all sessions, keyed by content hash and capped in bytes"""
+    return ParseCache()
+
+
+parse_cache = init_parse_cache()
+
+
+def jump_to_match(hits):
+    """Move the text viewer's window to the line of the chosen search match"""
+    if st.session_state.text_match is not None:
+        st.session_state.text_start = hits[st.session_state.text_match].line
+
 # Set up the page configuration
 st.title("📁 File Upload and Display Demo")
 st.markdown("Upload a file and see its content displayed below!")
@@ -39,16 +56,47 @@ if uploaded_file is not None:
      
     try:
         if file_extension in ['txt', 'py', 'html', 'css', 'js', 'md']:
-            # Display text-based files
-            content = uploaded_file.read().decode('utf-8')
-            st.text_area("File Content", content, height=400)
+            # Only the lines on screen are decoded; the index keeps one byte offset per 1000 lines
+            data = uploaded_file.getvalue()
+            digest = file_digest(data)
+            index = line_index(parse_cache, data, digest)
+            st.write(f"**Lines:** {index.lines:,}")
+            query = st.text_input("Search in file")
+            if query:
+                hits, truncated = search_upload(parse_cache, data, query, digest)
+                st.caption(f"{len(hits)}{'+' if truncated else ''} matches")
+                if hits:
+                    st.selectbox("Jump to match", range(len(hits)), index=None, key="text_match",
+                                 format_func=lambda i: f"Line {hits[i].line:,}, col {hits[i].column}: {hits[i].preview}",
+                                 on_change=jump_to_match, args=(hits,))
+            line_col, window_col = st.columns(2)
+            with line_col:
+                start_line = st.number_input("First line", min_value=1, max_value=max(index.lines, 1),
+                                             key="text_start")
+            with window_col:
+                window_lines = st.selectbox("Lines shown", [100, 500, 2000])
+            content = read_lines(data, index, start_line, window_lines)
+            last_line = min(start_line + window_lines - 1, index.lines)
+            st.text_area(f"Lines {start_line:,}-{last_line:,}", content, height=400,
+                         key=f"text_{start_line}_{window_lines}")
             
         elif file_extension == 'csv':
-            # Display CSV files as dataframe
-            df = pd.read_csv(uploaded_file)
-            st.write("**CSV Data:**")
-            st.dataframe(df)
-            st.write(f"**Shape:** {df.shape[0]} rows × {df.shape[1]} columns")
+            # The preview reads only the first rows; the profile streams the file in chunks
+            # so even multi-GB exports are never loaded as one DataFrame
+            st.write(f"**CSV Preview (first {DEFAULT_PREVIEW_ROWS} rows):**")
+            st.dataframe(csv_preview(uploaded_file))
+            engine = st.radio("CSV reader", ENGINES, horizontal=True)
+            progress = st.progress(0.0, text="Profiling CSV...")
+            profile = csv_profile(parse_cache, uploaded_file.getvalue(), engine,
+                                  progress_callback=lambda done, total: progress.progress(
+                                      min(done / total, 1.0) if total else 0.0, text=f"Profiling CSV... {done:,} bytes"))
+            progress.empty()
+            st.write(f"**Shape:** {profile.rows:,} rows × {len(profile.columns)} columns "
+                     f"(profiled in {profile.seconds:.2f}s with {profile.engine})")
+            st.write("**Column Statistics:**")
+            st.dataframe(profile.to_frame(), hide_index=True)
+            if profile.sample is not None and st.checkbox(f"Show {len(profile.sample):,} randomly sampled rows"):
+                st.dataframe(profile.sample)
             
         elif file_extension == 'json':
             # Display JSON files
@@ -59,11 +107,14 @@ if uploaded_file is not None:
             st.json(json_data)
             
         elif file_extension in ['png', 'jpg', 'jpeg', 'gif']:
-            # Display image files
-            image = Image.open(uploaded_file)
+            # A cached, size-capped thumbnail is sent instead of the full-resolution image
+            preview = thumbnail(parse_cache, uploaded_file.getvalue())
             st.write("**Image Preview:**")
-            st.image(image, caption=f"Uploaded Image: {uploaded_file.name}")
-            st.write(f"**Image Size:** {image.size[0]} × {image.size[1]} pixels")
+            st.image(preview.data, caption=f"Uploaded Image: {uploaded_file.name}")
+            st.write(f"**Image Size:** {preview.width} × {preview.height} pixels "
+                     f"({preview.source_format}, preview {len(preview.data):,} bytes)")
+            if st.checkbox("Show full resolution"):
+                st.image(uploaded_file.getvalue())
             
         elif file_extension == 'pdf':
             # For PDF files, show that it's uploaded but would need PyPDF2 for content
@@ -1,9 +1,13 @@
 # Import required libraries
 import streamlit as st
-import pandas as pd
-from PIL import Image  # Python Imaging Library for working with images
-from PyPDF2 import PdfReader
-import json
+
+import time
+
+from csv_profile import DEFAULT_PREVIEW_ROWS, ENGINES, csv_preview
+from text_window import read_lines
+from upload_preview import (IMAGE_EXTENSIONS, RAW_PREVIEW_BYTES, TEXT_EXTENSIONS, ParseCache, ParsePool,
+                            csv_profile, file_digest, line_index, parse_upload, pdf_page_count, pdf_page_text,
+                            search_upload, thumbnail)
 
 # Set up the page configuration
 st.title("📁 Multi-File Upload and Display Demo")
@@ -16,15 +20,57 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True  # This enables multiple file selection
 )
 
+@st.cache_resource
+def init_parse_cache():
+    """Parse results shared by all sessions, keyed by content hash and capped in bytes"""
+    return ParseCache()
+
+
+@st.cache_resource
+def init_parse_pool():
+    """Worker processes for PDFs and threads for other files, started once per server"""
+    return ParsePool()
+
+
+parse_cache = init_parse_cache()
+
+
+def parse_all_files(uploaded_files):
+    """Parse every upload in the worker pools, filling in a timing table as each file finishes"""
+    table = st.empty()
+    rows = []
+    started = time.perf_counter()
+    files = ((uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files)
+    for timing in init_parse_pool().parse_all(parse_cache, files):
+        rows.append({
+            "File": timing.name,
+            "Size (bytes)": timing.size,
+            "Worker": timing.pool,
+            "Parse time (s)": round(timing.seconds, 3),
+            "Status": f"❌ {timing.error}" if timing.error else "✅",
+        })
+        table.dataframe(rows, use_container_width=True)
+    wall_seconds = time.perf_counter() - started
+    st.session_state.parse_timings = {"rows": rows, "wall_seconds": wall_seconds}
+
+
+def jump_to_match(hits, match_key, start_key):
+    """Move a text viewer's window to the line of the chosen search match"""
+    if st.session_state[match_key] is not None:
+        st.session_state[start_key] = hits[st.session_state[match_key]].line
+
+
 # Function to display individual file content
 def display_file_content(uploaded_file, file_number):
-    """Display content for a single uploaded file"""
+    """Display a collapsed card for one uploaded file; its content is parsed only once the card is opened"""
     
-    # Create an expander for each file to keep the interface organized
-    with st.expander(f"📄 File {file_number}: {uploaded_file.name}", expanded=True):
-        
-        # Display file information
-        st.success(f"✅ File uploaded successfully!")
+    with st.container(border=True):
+        opened = st.toggle(
+            f"📄 File {file_number}: {uploaded_file.name} ({uploaded_file.size:,} bytes)",
+            key=f"open_{file_number}_{uploaded_file.file_id}",
+        )
+        if not opened:
+            return
         
         # Show file details
         file_details = {
@@ -37,63 +83,96 @@ def display_file_content(uploaded_file, file_number):
         for key, value in file_details.items():
             st.write(f"**{key}:** {value}")
         
-        # Get file extension to determine how to display content
+        # getvalue() returns the bytes without moving the file pointer
+        data = uploaded_file.getvalue()
+        digest = file_digest(data)
         file_extension = uploaded_file.name.split('.')[-1].lower()
         
         st.subheader("📄 File Content")
         
         try:
-            if file_extension in ['txt', 'py', 'html', 'css', 'js', 'md']:
-                # Display text-based files
-                content = uploaded_file.read().decode('utf-8')
-                st.text_area(f"Content of {uploaded_file.name}", content, height=300, key=f"text_{file_number}")
+            if file_extension in TEXT_EXTENSIONS:
+                # Only the lines on screen are decoded; the index keeps one byte offset per 1000 lines
+                index = line_index(parse_cache, data, digest)
+                st.write(f"**Lines:** {index.lines:,}")
+                start_key = f"text_start_{file_number}_{uploaded_file.file_id}"
+                query = st.text_input("Search in file", key=f"text_search_{file_number}_{uploaded_file.file_id}")
+                if query:
+                    hits, truncated = search_upload(parse_cache, data, query, digest)
+                    st.caption(f"{len(hits)}{'+' if truncated else ''} matches")
+                    if hits:
+                        match_key = f"text_match_{file_number}_{uploaded_file.file_id}"
+                        st.selectbox("Jump to match", range(len(hits)), index=None, key=match_key,
+                                     format_func=lambda i: f"Line {hits[i].line:,}, col {hits[i].column}: {hits[i].preview}",
+                                     on_change=jump_to_match, args=(hits, match_key, start_key))
+                line_col, window_col = st.columns(2)
+                with line_col:
+                    start_line = st.number_input("First line", min_value=1, max_value=max(index.lines, 1), key=start_key)
+                with window_col:
+                    window_lines = st.selectbox("Lines shown", [100, 500, 2000],
+                                                key=f"text_window_{file_number}_{uploaded_file.file_id}")
+                content = read_lines(data, index, start_line, window_lines)
+                last_line = min(start_line + window_lines - 1, index.lines)
+                st.text_area(f"Lines {start_line:,}-{last_line:,} of {uploaded_file.name}", content, height=300,
+                             key=f"text_{file_number}_{start_line}_{window_lines}")
                 
             elif file_extension == 'csv':
-                # Display CSV files as dataframe
-                df = pd.read_csv(uploaded_file)
-                st.write("**CSV Data:**")
-                st.dataframe(df, key=f"csv_{file_number}")
-                st.write(f"**Shape:** {df.shape[0]} rows × {df.shape[1]} columns")
+                # The preview reads only the first rows; the profile streams the file in chunks
+                st.write(f"**CSV Preview (first {DEFAULT_PREVIEW_ROWS} rows):**")
+                st.dataframe(csv_preview(data), key=f"csv_{file_number}")
+                engine = st.radio("CSV reader", ENGINES, horizontal=True,
+                                  key=f"csv_engine_{file_number}_{uploaded_file.file_id}")
+                progress = st.progress(0.0, text="Profiling CSV...")
+                profile = csv_profile(parse_cache, data, engine, digest,
+                                      lambda done, total: progress.progress(min(done / total, 1.0) if total else 0.0,
+                                                                            text=f"Profiling CSV... {done:,} bytes"))
+                progress.empty()
+                st.write(f"**Shape:** {profile.rows:,} rows × {len(profile.columns)} columns "
+                         f"(profiled in {profile.seconds:.2f}s with {profile.engine})")
+                st.dataframe(profile.to_frame(), hide_index=True, key=f"csv_stats_{file_number}")
+                if profile.sample is not None and st.checkbox(
+                        f"Show {len(profile.sample):,} randomly sampled rows",
+                        key=f"csv_sample_{file_number}_{uploaded_file.file_id}"):
+                    st.dataframe(profile.sample, key=f"csv_sample_rows_{file_number}")
                 
             elif file_extension == 'json':
                 # Display JSON files
-                content = uploaded_file.read().decode('utf-8')
-                json_data = json.loads(content)
+                json_data = parse_upload(parse_cache, uploaded_file.name, data, digest)
                 st.write("**JSON Content:**")
                 st.json(json_data)
                 
-            elif file_extension in ['png', 'jpg', 'jpeg', 'gif']:
-                # Display image files
-                image = Image.open(uploaded_file)
+            elif file_extension in IMAGE_EXTENSIONS:
+                # A cached, size-capped thumbnail is sent instead of the full-resolution image
+                preview = thumbnail(parse_cache, data, digest=digest)
                 st.write("**Image Preview:**")
-                st.image(image, caption=f"Uploaded Image: {uploaded_file.name}")
-                st.write(f"**Image Size:** {image.size[0]} × {image.size[1]} pixels")
+                st.image(preview.data, caption=f"Uploaded Image: {uploaded_file.name}")
+                st.write(f"**Image Size:** {preview.width} × {preview.height} pixels "
+                         f"({preview.source_format}, preview {len(preview.data):,} bytes)")
+                if st.checkbox("Show full resolution", key=f"full_image_{file_number}_{uploaded_file.file_id}"):
+                    st.image(data)
                 
             elif file_extension == 'pdf':
-                # Handle PDF files with PyPDF2
+                # Only the page being viewed is extracted
                 st.write("**PDF File Content:**")
                 try:
-                    pdf_reader = PdfReader(uploaded_file)
-                    text = ""
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        text += f"\n--- Page {page_num + 1} ---\n"
-                        text += page.extract_text()
-                    
-                    st.text_area(f"PDF Content of {uploaded_file.name}", text, height=300, key=f"pdf_{file_number}")
-                    st.info(f"📋 Total pages: {len(pdf_reader.pages)}")
+                    total_pages = pdf_page_count(parse_cache, data, digest)
+                    st.info(f"📋 Total pages: {total_pages}")
+                    if total_pages:
+                        page_number = st.number_input("Page", min_value=1, max_value=total_pages, value=1,
+                                                      key=f"pdf_page_{file_number}_{uploaded_file.file_id}")
+                        text = pdf_page_text(parse_cache, data, page_number, digest)
+                        st.text_area(f"Page {page_number} of {uploaded_file.name}", text, height=300,
+                                     key=f"pdf_{file_number}_{page_number}")
                     
                 except Exception as pdf_error:
                     st.error(f"❌ Error reading PDF: {str(pdf_error)}")
                 
             else:
                 # For other file types, show raw content
-                st.write("**Raw File Content (first 1000 bytes):**")
-                raw_content = uploaded_file.read()
-                if len(raw_content) > 1000:
-                    st.text(raw_content[:1000])
-                    st.info(f"Showing first 1000 bytes of {len(raw_content)} total bytes")
-                else:
-                    st.text(raw_content)
+                st.write(f"**Raw File Content (first {RAW_PREVIEW_BYTES} bytes):**")
+                st.text(parse_upload(parse_cache, uploaded_file.name, data, digest))
+                if len(data) > RAW_PREVIEW_BYTES:
+                    st.info(f"Showing first {RAW_PREVIEW_BYTES} bytes of {len(data)} total bytes")
                     
         except Exception as e:
             st.error(f"❌ Error reading file {uploaded_file.name}: {str(e)}")
@@ -118,14 +197,32 @@ if uploaded_files:
     
     st.write(f"**File Types Found:** {', '.join(file_types)}")
     
-    # Display each file's content
+    # Optionally parse everything up front, spread over all cores
+    if st.button("⚡ Parse all files in parallel"):
+        parse_all_files(uploaded_files)
+    elif "parse_timings" in st.session_state:
+        st.dataframe(st.session_state.parse_timings["rows"], use_container_width=True)
+    if "parse_timings" in st.session_state:
+        timings = st.session_state.parse_timings
+        parse_seconds = sum(row["Parse time (s)"] for row in timings["rows"])
+        st.caption(f"Wall clock {timings['wall_seconds']:.2f}s for {parse_seconds:.2f}s of parsing work")
+    
+    # Display one page of collapsed file cards; only opened cards parse their file
     st.subheader("📋 File Contents")
     
-    for i, uploaded_file in enumerate(uploaded_files, 1):
+    page_col, size_col = st.columns(2)
+    with size_col:
+        files_per_page = st.selectbox("Files per page", [5, 10, 20, 50], index=1)
+    page_count = (len(uploaded_files) + files_per_page - 1) // files_per_page
+    with page_col:
+        current_page = st.number_input("Page", min_value=1, max_value=page_count, value=1)
+    first = (current_page - 1) * files_per_page
+    st.caption(f"Files {first + 1}-{min(first + files_per_page, len(uploaded_files))} of {len(uploaded_files)} · "
+               f"parse cache: {len(parse_cache)} entries, {parse_cache.size_bytes:,} bytes, "
+               f"{parse_cache.stats.hit_rate:.0%} hit rate")
+    
+    for i, uploaded_file in enumerate(uploaded_files[first:first + files_per_page], first + 1):
         display_file_content(uploaded_file, i)
-        
-        # Reset file pointer for next read (important for multiple operations)
-        uploaded_file.seek(0)
 
 else:
     # Show instructions when no files are uploaded
@@ -1,60 +1,77 @@
 # Import required libraries
 import os
+import sys
 # Import dotenv to load environment variables from .env file
 from dotenv import load_dotenv
+from embedding_cache import CachedEmbedder, EmbeddingCache
+from embedding_engine import (
+    GENAI_AVAILABLE,
+    EmbeddingEngine,
+    LocalEmbeddingModel,
+    benchmark_engine,
+    create_model,
+)
 
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
+if not GENAI_AVAILABLE:
     print("google-generativeai not installed. Run: pip install google-generativeai")
 
 # Load environment variables from .env file
 load_dotenv()
 
-def create_embedding_demo():
+def create_embedding_engine(offline=False, max_concurrency=4):
+    """Build an embedding engine for Gemini, or for the local stand-in model when offline"""
+    if offline:
+        model = create_model("local")
+    else:
+        # Try to get API key from environment variable first
+        model = create_model("gemini", api_key=os.getenv('GOOGLE_API_KEY'))
+    return EmbeddingEngine(model, max_concurrency=max_concurrency)
+
+def create_cached_embedder(offline=False, max_concurrency=4, cache_path=None):
+    """Wrap the embedding engine with the on-disk cache so unchanged texts are never re-embedded"""
+    engine = create_embedding_engine(offline=offline, max_concurrency=max_concurrency)
+    cache = EmbeddingCache(cache_path) if cache_path else EmbeddingCache()
+    return CachedEmbedder(engine, cache)
+
+def embed_texts(texts, offline=False, max_concurrency=4, task_type="retrieval_document"):
+    """Embed an iterable of texts in batches and return vectors in input order"""
+    embedder = create_cached_embedder(offline=offline, max_concurrency=max_concurrency)
+    return embedder.embed(texts, task_type=task_type)
+
+def create_embedding_demo(offline=False):
     """Demonstrate text embedding using Google's Gemini API"""
     
-    if not GENAI_AVAILABLE:
+    if not GENAI_AVAILABLE and not offline:
         print("❌ google-generativeai package not available")
         return
     
     # Set up the Google API key
     try:
-        # Try to get API key from environment variable first
-        api_key = os.getenv('GOOGLE_API_KEY')
-        
-        # Configure the API
-        genai.configure(api_key=api_key)
-        print("✅ API configured successfully")
+        embedder = create_cached_embedder(offline=offline)
+        print(f"✅ Embedding engine configured successfully ({embedder.model_name})")
         
         # Text to create embedding for
         text_to_embed = "What is the meaning of life?"
         print(f"📝 Creating embedding for: '{text_to_embed}'")
         
-        # Generate embedding using the correct method
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=text_to_embed,
-            task_type="retrieval_document"
-        )
+        # Generate embedding using the batched engine (served from the cache on repeat runs)
+        embedding = embedder.embed_one(text_to_embed, task_type="retrieval_document")
+        cache_stats = embedder.stats
+        print(f"💾 Cache: {cache_stats.hits} hit(s), {cache_stats.misses} miss(es)")
         
         # Display results
         print("🎉 Embedding generated successfully!")
-        print(f"📊 Embedding dimensions: {len(result['embedding'])}")
-        print(f"🔢 First values: {result['embedding']}")
-        # print(f"🔢 Last values: {result['embedding']}")
+        print(f"📊 Embedding dimensions: {len(embedding)}")
+        print(f"🔢 First values: {embedding[:10]}")
         
         # Optional: Show some statistics about the embedding
-        embedding = result['embedding']
         import statistics
         print(f"📈 Statistics:")
         print(f"   Mean: {statistics.mean(embedding):.6f}")
         print(f"   Min: {min(embedding):.6f}")
         print(f"   Max: {max(embedding):.6f}")
         
-        return result['embedding']
+        return embedding
         
     except Exception as e:
         print(f"❌ Error creating embedding: {str(e)}")
@@ -66,11 +83,25 @@ def create_embedding_demo():
         print("5. Check your internet connection")
         return None
 
+def benchmark_demo(n_texts=2000, latency_seconds=0.05):
+    """Compare serial and concurrent throughput against the offline stand-in model"""
+    print(f"⏱️ Benchmarking {n_texts} texts with {latency_seconds * 1000:.0f} ms simulated latency per batch")
+    for concurrency in (1, 2, 4, 8):
+        model = LocalEmbeddingModel(latency_seconds=latency_seconds)
+        stats = benchmark_engine(EmbeddingEngine(model, max_concurrency=concurrency), n_texts=n_texts)
+        print(f"   concurrency={concurrency}: {stats.batches} batches in {stats.seconds:.2f}s "
+              f"({stats.texts_per_second:,.0f} texts/s)")
+
 if __name__ == "__main__":
+    # Pass --offline to use the local stand-in model, --benchmark to measure throughput
+    if "--benchmark" in sys.argv:
+        benchmark_demo()
+        sys.exit(0)
+    
     print("🚀 Google Gemini Embedding Demo")
     print("=" * 40)
     
-    embedding = create_embedding_demo()
+    embedding = create_embedding_demo(offline="--offline" in sys.argv)
     
     if embedding:
         print(f"\n✅ Success! Generated {len(embedding)}-dimensional embedding vector")
@@ -3,7 +3,38 @@ import chromadb
 from chromadb.config import Settings
 import os
 import tempfile
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collection_snapshot import DTYPES, export_collection, import_snapshot, read_manifest
+from bulk_ingest import (
+    SUPPORTED_FORMATS,
+    IngestCheckpoint,
+    ingest_rows,
+    iter_folder_rows,
+    iter_rows,
+    source_fingerprint,
+)
+from dedup import DEFAULT_THRESHOLD, DedupIndex
+from embedding_cache import CachedEmbedder, EmbeddingCache
+from flat_index import DTYPES as FLAT_DTYPES, FlatCollection
+from hnsw_tuning import SPACES, HnswParams, get_or_create_collection, set_ef_search
+from metadata_facets import FacetIndex, combine_conditions, contains_condition, range_condition, value_condition
+from pdf_pipeline import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, ingest_pdf
+from query_cache import QueryCache
+from write_queue import WriteQueue
+from store_maintenance import (
+    collection_usage,
+    directory_size,
+    orphaned_segment_dirs,
+    rebuild_collection,
+    remove_orphaned_segments,
+    sqlite_usage,
+    vacuum,
+)
+from embedding_engine import EmbeddingEngine, warm_up_model
+from dotenv import load_dotenv
+
+# Load environment variables (GOOGLE_API_KEY, VECTOR_STORE_EMBEDDING) from .env file
+load_dotenv()
 
 # Configure Streamlit page
 st.set_page_config(
@@ -26,6 +57,468 @@ def init_chromadb_client():
     client = chromadb.PersistentClient(path=db_path)
     return client
 
+# Resolve and warm up the embedding model once per process
+@st.cache_resource
+def init_embedding_model():
+    """Load the model chosen by VECTOR_STORE_EMBEDDING (default, gemini or local) and run one inference"""
+    backend = os.getenv("VECTOR_STORE_EMBEDDING", "default")
+    # 384 dimensions like the default model, but the two models' vectors are not comparable:
+    # collections record the model that filled them (see embedding_mismatch)
+    return warm_up_model(backend, api_key=os.getenv("GOOGLE_API_KEY"), dimensions=384)
+
+# Initialize the embedder shared by every session
+@st.cache_resource
+def init_embedder():
+    """Wrap the warmed-up embedding model with the persistent embedding cache"""
+    model, report = init_embedding_model()
+    # The default model runs locally on the CPU, so one batch at a time is enough
+    engine = EmbeddingEngine(model, max_concurrency=4 if report.backend == "gemini" else 1)
+    return CachedEmbedder(engine, EmbeddingCache())
+
+# Initialize the query result cache shared by every session
+@st.cache_resource
+def init_query_cache():
+    """Cache of search results, invalidated by a per-collection version bumped on every write"""
+    return QueryCache()
+
+# Open in-process flat index collections once per process, so every session shares one copy
+@st.cache_resource
+def open_flat_collection(name: str, _dtype: str, _space: str, _metadata: Optional[Dict[str, Any]] = None):
+    """Load (memory-mapped) or create a flat index collection under ./flat_indexes.
+
+    Cached by name only (underscore arguments are not hashed): two instances on one directory would
+    overwrite each other's files. dtype, space and metadata only apply when the collection is created.
+    """
+    return FlatCollection.open(name, os.path.join(os.getcwd(), "flat_indexes", name), dtype=_dtype, space=_space,
+                               metadata=_metadata)
+
+def embedding_metadata() -> Dict[str, Any]:
+    """Collection metadata recording which embedding model produced the stored vectors"""
+    _, report = init_embedding_model()
+    return {"embedding_model": report.model_name, "embedding_dimensions": report.dimensions}
+
+def embedding_mismatch(collection) -> Optional[str]:
+    """Why the current embedding model cannot search or extend collection, or None if it can"""
+    stored = collection.metadata or {}
+    if "embedding_model" not in stored:
+        # Created before collections recorded their model
+        return None
+    current = embedding_metadata()
+    if (stored["embedding_model"], stored.get("embedding_dimensions")) == (
+            current["embedding_model"], current["embedding_dimensions"]):
+        return None
+    return (f"'{collection.name}' holds {stored['embedding_model']} embeddings "
+            f"({stored.get('embedding_dimensions')} dims), but the current model is "
+            f"{current['embedding_model']} ({current['embedding_dimensions']} dims); their vectors are not "
+            f"comparable. Set VECTOR_STORE_EMBEDDING to the collection's model or use another collection.")
+
+# Initialize the metadata facet index shared by every session
+@st.cache_resource
+def init_facet_index():
+    """Distinct metadata values and counts per collection, used to fill the search filters"""
+    return FacetIndex()
+
+# Initialize the duplicate detector shared by every session
+@st.cache_resource
+def init_dedup_index():
+    """Content hashes and MinHash signatures per collection, seeded from stored documents"""
+    return DedupIndex()
+
+# Initialize the background writer shared by every session
+@st.cache_resource
+def init_write_queue():
+    """Single writer thread that batches adds and deletes from all sessions into one call each"""
+    # Search results are invalidated when a batch lands, not when a write is queued. The cache is
+    # looked up here: the writer thread has no script context to call a cached function from
+    query_cache = init_query_cache()
+    return WriteQueue(on_flush=query_cache.bump)
+
+def collection_changed(collection_name: str):
+    """Drop everything cached about a collection after a write that was not tracked incrementally"""
+    init_query_cache().bump(collection_name)
+    init_facet_index().invalidate(collection_name)
+
+def render_dedup_report(report):
+    """Summarize the rows an ingestion skipped as duplicates"""
+    if not report.total:
+        return
+    st.info(f"♻️ Skipped {report.total:,} duplicate(s): {report.exact:,} exact, {report.near:,} near-duplicate")
+    with st.expander("Skipped duplicates"):
+        st.dataframe([{"ID": hit.id, "Kind": hit.kind, "Duplicate of": hit.duplicate_of,
+                       "Similarity": round(hit.similarity, 3)} for hit in report.skipped],
+                     use_container_width=True)
+
+def render_bulk_ingestion(embedder, deduplicate=False):
+    """Bulk upload of CSV/JSONL/Parquet files or a server-side folder, upserted in chunks"""
+    with st.expander("📦 Bulk Ingestion"):
+        source_type = st.radio("Source", ["Upload file", "Folder path"], horizontal=True)
+        uploaded = None
+        folder_path = ""
+        if source_type == "Upload file":
+            uploaded = st.file_uploader("CSV, JSONL or Parquet file", type=['csv', 'jsonl', 'parquet'])
+            id_column = st.text_input("ID column", value="id")
+            text_column = st.text_input("Text column", value="text")
+            st.caption("All other columns are stored as metadata.")
+        else:
+            folder_path = st.text_input("Folder path", placeholder="e.g., ./docs")
+        chunk_size = st.number_input("Chunk size (documents per upsert)", min_value=1, max_value=5000, value=256)
+        resume = st.checkbox("Resume from last committed chunk", value=True)
+        
+        if st.button("Start Bulk Ingestion"):
+            if not hasattr(st.session_state, 'collection'):
+                st.warning("⚠️ Please create/select a collection first!")
+                return
+            if source_type == "Upload file" and uploaded is None:
+                st.warning("⚠️ Please upload a file!")
+                return
+            if source_type == "Folder path" and not os.path.isdir(folder_path):
+                st.warning("⚠️ Please enter an existing folder path!")
+                return
+            
+            collection = st.session_state.collection
+            if uploaded is not None:
+                file_format = uploaded.name.split('.')[-1].lower()
+                if file_format not in SUPPORTED_FORMATS:
+                    st.error(f"❌ Unsupported file format: {file_format}")
+                    return
+                # Fingerprint the name plus the first MB so a different file with the same name starts over
+                key_source = source_fingerprint(uploaded.name, uploaded.getvalue()[:1024 * 1024])
+                rows = iter_rows(uploaded, file_format, id_column, text_column)
+            else:
+                key_source = source_fingerprint(os.path.abspath(folder_path))
+                rows = iter_folder_rows(folder_path)
+            checkpoint_key = f"{collection.name}:{key_source}"
+            checkpoint = IngestCheckpoint()
+            if not resume:
+                checkpoint.clear(checkpoint_key)
+            
+            progress_bar = st.progress(0.0, text="Starting...")
+            throughput = st.empty()
+            # Total row count is unknown while streaming, so the bar tracks upload bytes read when possible
+            total_bytes = uploaded.size if uploaded is not None else None
+            
+            def on_progress(result):
+                if total_bytes:
+                    progress_bar.progress(min(uploaded.tell() / total_bytes, 1.0),
+                                          text=f"{result.rows_committed:,} documents committed")
+                else:
+                    progress_bar.progress(0.0, text=f"{result.rows_committed:,} documents committed")
+                throughput.write(f"⚡ {result.docs_per_second:,.1f} docs/s over {result.chunks} chunk(s)")
+            
+            try:
+                # With deduplication off, an already seeded deduplicator still learns the new rows
+                dedup_index = init_dedup_index()
+                deduplicator = dedup_index.get(collection) if deduplicate else dedup_index.peek(collection)
+                result = ingest_rows(collection, rows, embedder=embedder, chunk_size=int(chunk_size),
+                                     checkpoint=checkpoint, checkpoint_key=checkpoint_key,
+                                     progress_callback=on_progress, deduplicator=deduplicator,
+                                     skip_duplicates=deduplicate, facet_index=init_facet_index())
+                init_query_cache().bump(collection.name)
+                progress_bar.progress(1.0, text="Done")
+                st.success(f"✅ Ingested {result.rows_committed:,} documents in {result.seconds:.1f}s "
+                           f"({result.docs_per_second:,.1f} docs/s)")
+                if result.rows_resumed:
+                    st.info(f"⏩ Skipped {result.rows_resumed:,} documents committed by a previous run")
+                render_dedup_report(result.dedup)
+            except Exception as e:
+                # Chunks committed before the failure are already in the collection, and the
+                # facet counts may include the chunk that failed
+                collection_changed(collection.name)
+                st.error(f"❌ Bulk ingestion stopped: {str(e)}")
+                st.info(f"Committed chunks are saved. Run again with resume enabled to continue from row "
+                        f"{checkpoint.get(checkpoint_key):,}.")
+
+def render_pdf_ingestion(embedder, deduplicate=False):
+    """Chunk uploaded PDFs page by page and upsert the chunks with page-number metadata"""
+    with st.expander("📄 PDF Ingestion"):
+        pdf_files = st.file_uploader("PDF files", type=['pdf'], accept_multiple_files=True)
+        max_tokens = st.number_input("Max tokens per chunk", min_value=16, max_value=2048, value=DEFAULT_MAX_TOKENS)
+        overlap_tokens = st.number_input("Overlap tokens", min_value=0, max_value=512, value=DEFAULT_OVERLAP_TOKENS)
+        batch_size = st.number_input("Chunks per upsert batch", min_value=1, max_value=1000, value=64)
+        
+        if st.button("Ingest PDFs"):
+            if not hasattr(st.session_state, 'collection'):
+                st.warning("⚠️ Please create/select a collection first!")
+                return
+            if not pdf_files:
+                st.warning("⚠️ Please upload at least one PDF!")
+                return
+            if overlap_tokens >= max_tokens:
+                st.warning("⚠️ Overlap must be smaller than the chunk size!")
+                return
+            
+            # Search results cached before this ingestion are out of date
+            init_query_cache().bump(st.session_state.collection.name)
+            for pdf_file in pdf_files:
+                status = st.empty()
+                
+                def on_progress(result, name=pdf_file.name):
+                    status.write(f"⏳ {name}: {result.rows_committed:,} chunks "
+                                 f"({result.docs_per_second:,.1f} chunks/s)")
+                
+                try:
+                    dedup_index = init_dedup_index()
+                    deduplicator = (dedup_index.get(st.session_state.collection) if deduplicate
+                                    else dedup_index.peek(st.session_state.collection))
+                    result = ingest_pdf(st.session_state.collection, pdf_file, pdf_file.name, embedder=embedder,
+                                        max_tokens=int(max_tokens), overlap_tokens=int(overlap_tokens),
+                                        batch_size=int(batch_size), progress_callback=on_progress,
+                                        deduplicator=deduplicator, skip_duplicates=deduplicate,
+                                        facet_index=init_facet_index())
+                    init_query_cache().bump(st.session_state.collection.name)
+                    status.success(f"✅ {pdf_file.name}: {result.rows_committed:,} chunks in {result.seconds:.1f}s")
+                    render_dedup_report(result.dedup)
+                except Exception as e:
+                    collection_changed(st.session_state.collection.name)
+                    status.error(f"❌ Error ingesting {pdf_file.name}: {str(e)}")
+
+def parse_metadata_filter(text: str) -> Dict[str, Any]:
+    """Turn 'category=science, year=2024' into a Chroma where filter"""
+    conditions = []
+    for part in text.split(","):
+        if "=" not in part:
+            continue
+        key, value = (piece.strip() for piece in part.split("=", 1))
+        if not key:
+            continue
+        # Compare numbers as numbers so numeric metadata can match
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        conditions.append({key: value})
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def render_search_filters(collection, facet_index):
+    """Filter widgets filled from the facet index; returns (where, where_document) for the query"""
+    with st.expander("🎛️ Filters"):
+        try:
+            facets = facet_index.facets(collection)
+        except Exception as e:
+            st.error(f"❌ Error loading metadata facets: {str(e)}")
+            return None, None
+        
+        conditions = []
+        # Fields with a manageable number of distinct values become dropdowns (equality or $in)
+        for key, facet in sorted(facets.items()):
+            if facet.counts and not facet.numeric:
+                selected = st.multiselect(
+                    key.capitalize(),
+                    facet.top_values(),
+                    format_func=lambda value, counts=facet.counts: f"{value} ({counts[value]})",
+                    key=f"filter_{collection.name}_{key}"
+                )
+                conditions.append(value_condition(key, selected))
+        
+        numeric_fields = sorted(key for key, facet in facets.items() if facet.numeric)
+        if numeric_fields:
+            range_field = st.selectbox("Numeric range", ["(none)"] + numeric_fields)
+            if range_field != "(none)":
+                facet = facets[range_field]
+                range_col1, range_col2 = st.columns(2)
+                with range_col1:
+                    low = st.number_input("Min", value=float(facet.minimum))
+                with range_col2:
+                    high = st.number_input("Max", value=float(facet.maximum))
+                # Leave an untouched bound out of the filter
+                conditions.append(range_condition(
+                    range_field,
+                    low if low > facet.minimum else None,
+                    high if high < facet.maximum else None
+                ))
+        
+        contains = st.text_input("Document contains", placeholder="e.g., neural network")
+        if st.button("🔄 Refresh filter values"):
+            facet_index.invalidate(collection.name)
+            st.rerun()
+        
+        # Chroma applies these inside the index search, so top-k is taken from matching documents only
+        return combine_conditions(conditions), contains_condition(contains.strip())
+
+def render_document_browser(collection, count):
+    """Show one page of documents, fetched with limit/offset and without embeddings"""
+    filter_col1, filter_col2, filter_col3 = st.columns([2, 2, 1])
+    with filter_col1:
+        id_filter = st.text_input("Filter by IDs", placeholder="id1, id2, ...")
+    with filter_col2:
+        metadata_filter = st.text_input("Filter by metadata", placeholder="category=science, author=John Doe")
+    with filter_col3:
+        page_size = st.selectbox("Page size", [10, 25, 50, 100], index=1)
+    
+    ids = [doc_id.strip() for doc_id in id_filter.split(",") if doc_id.strip()] or None
+    where = parse_metadata_filter(metadata_filter) or None
+    
+    # Start from the first page whenever the filter or page size changes
+    browse_key = (collection.name, id_filter, metadata_filter, page_size)
+    if st.session_state.get("browse_key") != browse_key:
+        st.session_state.browse_key = browse_key
+        st.session_state.browse_page = 0
+    page = st.session_state.browse_page
+    
+    try:
+        # include= leaves embeddings out, and limit/offset keep the fetch to a single page
+        page_docs = collection.get(
+            ids=ids,
+            where=where,
+            limit=page_size,
+            offset=page * page_size,
+            include=["documents", "metadatas"]
+        )
+    except Exception as e:
+        st.error(f"❌ Error fetching documents: {str(e)}")
+        return
+    
+    filtered = ids is not None or where is not None
+    total_pages = None if filtered else max((count + page_size - 1) // page_size, 1)
+    has_next = (page + 1 < total_pages) if total_pages else len(page_docs['ids']) == page_size
+    
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+    with nav_col1:
+        if st.button("⬅️ Previous", disabled=page == 0):
+            st.session_state.browse_page = page - 1
+            st.rerun()
+    with nav_col2:
+        st.write(f"Page {page + 1}" + (f" of {total_pages}" if total_pages else ""))
+    with nav_col3:
+        if st.button("Next ➡️", disabled=not has_next):
+            st.session_state.browse_page = page + 1
+            st.rerun()
+    
+    if not page_docs['ids']:
+        st.info("No documents match this filter.")
+        return
+    
+    for i, (doc_id, doc, metadata) in enumerate(zip(
+        page_docs['ids'],
+        page_docs['documents'],
+        page_docs['metadatas'] or [{}] * len(page_docs['ids'])
+    )):
+        with st.expander(f"Document {page * page_size + i + 1}: {doc_id}"):
+            st.write("**Content:**")
+            st.write(doc)
+            if metadata:
+                st.write("**Metadata:**")
+                st.json(metadata)
+
+def format_bytes(size: int) -> str:
+    return f"{size / (1024 * 1024):,.1f} MB"
+
+def render_maintenance(client, db_path):
+    """Size accounting plus index rebuild and SQLite VACUUM for the persistent store"""
+    with st.expander("🧹 Store Maintenance"):
+        try:
+            usages = collection_usage(client, db_path)
+            sqlite_stats = sqlite_usage(db_path)
+            orphaned = orphaned_segment_dirs(db_path)
+        except Exception as e:
+            st.error(f"❌ Error reading store usage: {str(e)}")
+            return
+        
+        st.write(f"**Total on disk:** {format_bytes(directory_size(db_path))} · "
+                 f"**chroma.sqlite3:** {format_bytes(sqlite_stats.file_bytes)} "
+                 f"({sqlite_stats.free_pages:,} free pages = {format_bytes(sqlite_stats.free_bytes)})")
+        if orphaned:
+            st.write(f"**Orphaned index folders:** {len(orphaned)} "
+                     f"({format_bytes(sum(directory_size(path) for path in orphaned))})")
+            if st.button("🗑️ Remove Orphaned Folders"):
+                result = remove_orphaned_segments(db_path)
+                st.success(f"✅ Reclaimed {format_bytes(result.reclaimed_bytes)}")
+        st.dataframe([{
+            "Collection": usage.name,
+            "Documents": usage.documents,
+            # Deleted vectors stay in the HNSW index until it is rebuilt
+            "Index elements": usage.index_elements,
+            "Deleted in index": usage.deleted_elements,
+            "Index capacity": usage.index_capacity,
+            "Index size (MB)": round(usage.index_bytes / (1024 * 1024), 2),
+            "Text + metadata (MB)": None if usage.text_bytes is None else round(usage.text_bytes / (1024 * 1024), 2),
+        } for usage in usages], use_container_width=True)
+        st.caption("Index counts come from the index files on disk, which Chroma writes every "
+                   "`sync_threshold` (default 1000) changes.")
+        
+        maint_col1, maint_col2 = st.columns(2)
+        with maint_col1:
+            names = [usage.name for usage in usages]
+            rebuild_name = st.selectbox("Collection to rebuild", names) if names else None
+            if rebuild_name and st.button("🔧 Rebuild Index"):
+                progress = st.empty()
+                try:
+                    collection, result = rebuild_collection(
+                        client, rebuild_name, db_path,
+                        progress_callback=lambda copied: progress.write(f"⏳ {copied:,} documents copied")
+                    )
+                    collection_changed(rebuild_name)
+                    init_dedup_index().invalidate(rebuild_name)
+                    # The rebuilt collection has a new id, so the selected handle must be replaced
+                    if getattr(st.session_state, 'collection', None) is not None and st.session_state.collection.name == rebuild_name:
+                        st.session_state.collection = collection
+                    st.success(f"✅ Rebuilt '{rebuild_name}' in {result.seconds:.1f}s: "
+                               f"{format_bytes(result.before_bytes)} → {format_bytes(result.after_bytes)}")
+                except Exception as e:
+                    st.error(f"❌ Error rebuilding collection: {str(e)}")
+        with maint_col2:
+            if st.button("🗜️ VACUUM SQLite"):
+                try:
+                    result = vacuum(db_path)
+                    st.success(f"✅ VACUUM finished in {result.seconds:.2f}s: "
+                               f"{format_bytes(result.before_bytes)} → {format_bytes(result.after_bytes)}")
+                except Exception as e:
+                    st.error(f"❌ Error running VACUUM: {str(e)}")
+
+def render_snapshots(client):
+    """Export a collection with its embeddings to a snapshot folder, or import one without re-embedding"""
+    with st.expander("📸 Snapshots"):
+        snap_col1, snap_col2 = st.columns(2)
+        with snap_col1:
+            st.write("**Export**")
+            names = [collection.name for collection in client.list_collections()]
+            export_name = st.selectbox("Collection to export", names) if names else None
+            export_dtype = st.radio("Embedding precision", DTYPES, horizontal=True,
+                                    help="float16 halves the snapshot size at a small precision cost")
+            export_path = st.text_input("Export folder", value=os.path.join("snapshots", export_name or "collection"))
+            if export_name and st.button("📤 Export Snapshot"):
+                progress_bar = st.progress(0.0)
+                try:
+                    result = export_collection(
+                        client.get_collection(export_name), export_path, dtype=export_dtype,
+                        progress_callback=lambda done, total: progress_bar.progress(done / total)
+                    )
+                    st.success(f"✅ Exported {result.rows:,} documents in {result.seconds:.1f}s "
+                               f"({format_bytes(directory_size(export_path))})")
+                except Exception as e:
+                    st.error(f"❌ Error exporting snapshot: {str(e)}")
+        with snap_col2:
+            st.write("**Import**")
+            import_path = st.text_input("Snapshot folder", placeholder="e.g., snapshots/krish_collection")
+            import_name = st.text_input("Target collection", placeholder="Leave empty to keep the exported name")
+            if st.button("📥 Import Snapshot"):
+                if not os.path.isdir(import_path):
+                    st.warning("⚠️ Please enter an existing snapshot folder!")
+                    return
+                progress_bar = st.progress(0.0)
+                try:
+                    target = import_name.strip() or read_manifest(import_path)["collection"]
+                    # Results cached before the import are out of date, even if it fails part-way
+                    collection_changed(target)
+                    init_dedup_index().invalidate(target)
+                    collection, result = import_snapshot(
+                        client, import_path, target,
+                        progress_callback=lambda done, total: progress_bar.progress(done / total)
+                    )
+                    mismatch = embedding_mismatch(collection)
+                    if mismatch:
+                        st.warning(f"⚠️ Imported, but not selected: {mismatch}")
+                    else:
+                        st.session_state.collection = collection
+                    st.success(f"✅ Imported {result.rows:,} documents into '{collection.name}' in "
+                               f"{result.seconds:.1f}s ({result.rows_per_second:,.0f} docs/s, no re-embedding)")
+                except Exception as e:
+                    st.error(f"❌ Error importing snapshot: {str(e)}")
+
 def main():
     st.title("🔍 ChromaDB Vector Store Demo")
     st.markdown("### Persistent ChromaDB Client with krish_demo_db")
@@ -33,6 +526,10 @@ def main():
     # Initialize ChromaDB client
     try:
         client = init_chromadb_client()
+        embedder = init_embedder()
+        query_cache = init_query_cache()
+        facet_index = init_facet_index()
+        dedup_index = init_dedup_index()
         st.success(f"✅ ChromaDB persistent client initialized successfully!")
         st.info(f"📁 Database path: {os.path.join(os.getcwd(), 'krish_demo_db')}")
     except Exception as e:
@@ -45,17 +542,74 @@ def main():
     # Create or get collection
     collection_name = st.sidebar.text_input("Collection Name", value="krish_collection")
     
+    # Chroma's HNSW index, or an exact in-process search that is faster for small collections
+    backend = st.sidebar.radio("Backend", ["Chroma (HNSW)", "In-process flat index"],
+                               help="The flat index suits collections up to ~100k vectors")
+    
+    # HNSW index settings - only applied when the collection is created
+    with st.sidebar.expander("⚙️ Index Settings (new collections)"):
+        defaults = HnswParams()
+        hnsw_params = HnswParams(
+            space=st.selectbox("Distance space", SPACES, index=SPACES.index(defaults.space)),
+            max_neighbors=st.number_input("M (max neighbors)", min_value=2, max_value=128, value=defaults.max_neighbors),
+            ef_construction=st.number_input("ef_construction", min_value=10, max_value=2000, value=defaults.ef_construction),
+            ef_search=st.number_input("ef_search", min_value=1, max_value=2000, value=defaults.ef_search),
+        )
+        st.caption("Run `python hnsw_tuning.py --help` to compare recall and latency of different settings.")
+        flat_dtype = st.selectbox("Flat index storage", FLAT_DTYPES,
+                                  help="float16/int8 shrink the in-memory matrix; results are reranked in float32")
+    
     if st.sidebar.button("Create/Get Collection"):
         try:
-            collection = client.get_or_create_collection(
-                name=collection_name,
-                metadata={"description": "Demo collection for Krish's vector store"}
-            )
+            if backend == "In-process flat index":
+                collection = open_flat_collection(collection_name, flat_dtype, hnsw_params.space,
+                                                  embedding_metadata())
+                if (collection.dtype, collection.space) != (flat_dtype, hnsw_params.space):
+                    st.sidebar.warning(f"⚠️ '{collection_name}' already exists with {collection.dtype} storage and "
+                                       f"{collection.space} space; those settings are kept")
+            else:
+                collection = get_or_create_collection(
+                    client,
+                    collection_name,
+                    hnsw_params,
+                    metadata={"description": "Demo collection for Krish's vector store", **embedding_metadata()}
+                )
+            mismatch = embedding_mismatch(collection)
+            if mismatch:
+                raise ValueError(mismatch)
+            # Both backends may hold a collection of this name, so cached results cannot be trusted;
+            # the facet index and duplicate detector rescan by themselves when the backend differs
+            query_cache.bump(collection_name)
             st.session_state.collection = collection
             st.sidebar.success(f"✅ Collection '{collection_name}' ready!")
         except Exception as e:
             st.sidebar.error(f"❌ Error: {str(e)}")
     
+    # Duplicate detection for every kind of ingestion
+    with st.sidebar.expander("♻️ Deduplication"):
+        deduplicate = st.checkbox("Skip duplicate content", value=True,
+                                  help="Exact matches after normalizing case and whitespace, plus MinHash near-duplicates")
+        dedup_index.threshold = st.slider("Near-duplicate similarity", min_value=0.5, max_value=1.0,
+                                          value=DEFAULT_THRESHOLD, step=0.01,
+                                          help="Estimated Jaccard similarity of word 3-grams; 1.0 only skips exact copies")
+    
+    # Show the index settings of the selected collection; ef_search can still be changed
+    if isinstance(getattr(st.session_state, 'collection', None), FlatCollection):
+        flat = st.session_state.collection
+        st.sidebar.caption(f"Flat index: {flat.dtype}, {flat.space}, {flat.count():,} vectors, "
+                           f"{flat.memory_bytes / (1024 * 1024):.1f} MB scanned per query")
+    elif hasattr(st.session_state, 'collection'):
+        try:
+            current = HnswParams.from_collection(st.session_state.collection)
+            st.sidebar.caption(f"Index: {current.space}, M={current.max_neighbors}, "
+                               f"ef_construction={current.ef_construction}, ef_search={current.ef_search}")
+            new_ef_search = st.sidebar.number_input("Update ef_search", min_value=1, max_value=2000, value=current.ef_search)
+            if new_ef_search != current.ef_search and st.sidebar.button("Apply ef_search"):
+                set_ef_search(st.session_state.collection, int(new_ef_search))
+                st.sidebar.success("✅ ef_search saved - it applies once the database is reopened")
+        except Exception as e:
+            st.sidebar.error(f"❌ Error reading index settings: {str(e)}")
+    
     # Main content area
     col1, col2 = st.columns([1, 1])
     
@@ -73,7 +627,18 @@ def main():
         metadata_category = st.text_input("Category", placeholder="e.g., technology, science")
         
         if st.button("Add Document", type="primary"):
-            if doc_text and doc_id and hasattr(st.session_state, 'collection'):
+            duplicate = None
+            if doc_text and doc_id and hasattr(st.session_state, 'collection') and deduplicate:
+                try:
+                    # Remembered only once the write has succeeded, below
+                    duplicate = dedup_index.get(st.session_state.collection).check(doc_id, doc_text, remember=False)
+                except Exception as e:
+                    st.error(f"❌ Error checking for duplicates: {str(e)}")
+            if duplicate is not None:
+                st.warning(f"♻️ Not added: {'identical to' if duplicate.kind != 'near' else 'near-duplicate of'} "
+                           f"'{duplicate.duplicate_of}' (similarity {duplicate.similarity:.2f}). "
+                           f"Turn off deduplication in the sidebar to add it anyway.")
+            elif doc_text and doc_id and hasattr(st.session_state, 'collection'):
                 try:
                     # Prepare metadata
                     metadata = {}
@@ -84,12 +649,16 @@ def main():
                     if metadata_category:
                         metadata["category"] = metadata_category
                     
-                    # Add document to collection
-                    st.session_state.collection.add(
+                    # Add document to collection through the shared writer, waiting for its batch
+                    init_write_queue().add(
+                        st.session_state.collection,
                         documents=[doc_text],
                         ids=[doc_id],
-                        metadatas=[metadata] if metadata else None
-                    )
+                        metadatas=[metadata] if metadata else None,
+                        embeddings=embedder.embed([doc_text])
+                    ).result(timeout=60)
+                    facet_index.add(st.session_state.collection, [metadata])
+                    dedup_index.add(st.session_state.collection, doc_id, doc_text)
                     st.success(f"✅ Document '{doc_id}' added successfully!")
                     
                     # Clear inputs
@@ -102,6 +671,9 @@ def main():
                     st.warning("⚠️ Please create/select a collection first!")
                 else:
                     st.warning("⚠️ Please fill in both document text and ID!")
+        
+        render_bulk_ingestion(embedder, deduplicate)
+        render_pdf_ingestion(embedder, deduplicate)
     
     with col2:
         st.subheader("🔍 Search Documents")
@@ -109,41 +681,57 @@ def main():
         # Search functionality
         query_text = st.text_area("Search Query", height=100, placeholder="Enter your search query here...")
         n_results = st.slider("Number of Results", min_value=1, max_value=10, value=3)
+        where, where_document = None, None
+        if hasattr(st.session_state, 'collection'):
+            where, where_document = render_search_filters(st.session_state.collection, facet_index)
         
         if st.button("Search", type="primary"):
             if query_text and hasattr(st.session_state, 'collection'):
-                try:
-                    # Perform similarity search
-                    results = st.session_state.collection.query(
-                        query_texts=[query_text],
-                        n_results=n_results
-                    )
-                    
-                    st.write("**Search Results:**")
-                    
-                    if results['documents'][0]:
-                        for i, (doc, distance, doc_id, metadata) in enumerate(zip(
-                            results['documents'][0],
-                            results['distances'][0],
-                            results['ids'][0],
-                            results['metadatas'][0] or [{}] * len(results['documents'][0])
-                        )):
-                            with st.expander(f"Result {i+1} - ID: {doc_id} (Distance: {distance:.4f})"):
-                                st.write("**Document:**")
-                                st.write(doc)
-                                if metadata:
-                                    st.write("**Metadata:**")
-                                    st.json(metadata)
-                    else:
-                        st.info("No results found for your query.")
-                        
-                except Exception as e:
-                    st.error(f"❌ Error searching: {str(e)}")
+                # Remember the search so reruns from other widgets keep showing its (cached) results
+                st.session_state.last_search = {"query_text": query_text, "n_results": n_results,
+                                                "where": where, "where_document": where_document}
             else:
                 if not hasattr(st.session_state, 'collection'):
                     st.warning("⚠️ Please create/select a collection first!")
                 else:
                     st.warning("⚠️ Please enter a search query!")
+        
+        last_search = st.session_state.get("last_search")
+        if last_search and hasattr(st.session_state, 'collection'):
+            try:
+                # Perform similarity search (served from the cache until the collection changes)
+                results, cache_hit, latency_ms = query_cache.query(
+                    st.session_state.collection,
+                    last_search["query_text"],
+                    last_search["n_results"],
+                    embedder,
+                    where=last_search["where"],
+                    where_document=last_search["where_document"]
+                )
+                
+                st.write("**Search Results:**")
+                query_stats = query_cache.stats
+                st.caption(f"{'⚡ Cached' if cache_hit else '🔎 Fresh'} results in {latency_ms:.1f} ms · "
+                           f"cache hit rate {query_stats.hit_rate:.0%} ({query_stats.hits} hits / {query_stats.misses} misses)")
+                
+                if results['documents'][0]:
+                    for i, (doc, distance, doc_id, metadata) in enumerate(zip(
+                        results['documents'][0],
+                        results['distances'][0],
+                        results['ids'][0],
+                        results['metadatas'][0] or [{}] * len(results['documents'][0])
+                    )):
+                        with st.expander(f"Result {i+1} - ID: {doc_id} (Distance: {distance:.4f})"):
+                            st.write("**Document:**")
+                            st.write(doc)
+                            if metadata:
+                                st.write("**Metadata:**")
+                                st.json(metadata)
+                else:
+                    st.info("No results found for your query.")
+                    
+            except Exception as e:
+                st.error(f"❌ Error searching: {str(e)}")
     
     # Collection information
     if hasattr(st.session_state, 'collection'):
@@ -155,22 +743,9 @@ def main():
             st.metric("Total Documents", count)
             
             if count > 0:
-                # Show all documents
-                if st.button("Show All Documents"):
-                    all_docs = st.session_state.collection.get()
-                    
-                    st.write("**All Documents in Collection:**")
-                    for i, (doc_id, doc, metadata) in enumerate(zip(
-                        all_docs['ids'],
-                        all_docs['documents'],
-                        all_docs['metadatas'] or [{}] * len(all_docs['ids'])
-                    )):
-                        with st.expander(f"Document {i+1}: {doc_id}"):
-                            st.write("**Content:**")
-                            st.write(doc)
-                            if metadata:
-                                st.write("**Metadata:**")
-                                st.json(metadata)
+                # Browse documents one page at a time
+                if st.checkbox("📚 Browse Documents"):
+                    render_document_browser(st.session_state.collection, count)
                 
                 # Delete functionality
                 st.subheader("🗑️ Delete Documents")
@@ -178,7 +753,11 @@ def main():
                 if st.button("Delete Document", type="secondary"):
                     if doc_to_delete:
                         try:
-                            st.session_state.collection.delete(ids=[doc_to_delete])
+                            # Read the metadata first so the facet counts can be decremented
+                            deleted = st.session_state.collection.get(ids=[doc_to_delete], include=["metadatas"])
+                            init_write_queue().delete(st.session_state.collection, [doc_to_delete]).result(timeout=60)
+                            facet_index.remove(st.session_state.collection, deleted['metadatas'] or [])
+                            dedup_index.remove(st.session_state.collection, deleted['ids'])
                             st.success(f"✅ Document '{doc_to_delete}' deleted!")
                             st.rerun()
                         except Exception as e:
@@ -206,6 +785,29 @@ def main():
                     st.write(f"- {collection.name}")
             except Exception as e:
                 st.write(f"Error listing collections: {str(e)}")
+    
+    if os.path.exists(os.path.join(db_path, "chroma.sqlite3")):
+        render_maintenance(client, db_path)
+        render_snapshots(client)
+    
+    # Write queue statistics
+    write_stats = init_write_queue().stats
+    st.write(f"**Write Queue:** {write_stats.rows:,} rows in {write_stats.batches:,} batches "
+             f"({write_stats.rows_per_batch:.1f} rows/batch), {init_write_queue().pending} pending, "
+             f"{write_stats.failed} failed")
+    
+    # Embedding model warmup
+    _, warmup = init_embedding_model()
+    st.write(f"**Embedding Model:** {warmup.model_name} ({warmup.backend}, {warmup.dimensions} dims) · "
+             f"loaded in {warmup.load_seconds:.2f}s, warmup inference {warmup.warmup_seconds:.2f}s · "
+             f"~{warmup.memory_bytes / (1024 * 1024):.0f} MB memory")
+    
+    # Embedding cache statistics
+    cache_stats = embedder.stats
+    st.write(f"**Embedding Cache:** {len(embedder.cache):,} vectors, "
+             f"{embedder.cache.size_bytes / (1024 * 1024):.1f} MB "
+             f"({cache_stats.hits} hits / {cache_stats.misses} misses, "
+             f"{cache_stats.hit_rate:.0%} hit rate)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
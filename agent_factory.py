@@ -0,0 +1,176 @@
+# Shared pydantic-ai agents backed by one pooled, instrumented httpx client per process
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool limits and timeouts (seconds) for the model HTTP client"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Read overrides such as AGENT_POOL_MAX_CONNECTIONS=50 from the environment / .env file"""
+        def env(name, cast, default):
+            value = os.getenv(f"AGENT_POOL_{name}")
+            return cast(value) if value else default
+        defaults = cls()
+        return cls(
+            max_connections=env("MAX_CONNECTIONS", int, defaults.max_connections),
+            max_keepalive_connections=env("MAX_KEEPALIVE_CONNECTIONS", int, defaults.max_keepalive_connections),
+            keepalive_expiry=env("KEEPALIVE_EXPIRY", float, defaults.keepalive_expiry),
+            connect_timeout=env("CONNECT_TIMEOUT", float, defaults.connect_timeout),
+            read_timeout=env("READ_TIMEOUT", float, defaults.read_timeout),
+            http2=env("HTTP2", lambda v: v.lower() in ("1", "true", "yes"), defaults.http2),
+        )
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of connection pool usage"""
+    requests: int
+    new_connections: int
+    active_connections: int
+    idle_connections: int
+
+    @property
+    def reused_requests(self) -> int:
+        return max(self.requests - self.new_connections, 0)
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.reused_requests / self.requests if self.requests else 0.0
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Pooled async transport that counts requests and newly opened connections"""
+
+    def __init__(self, config: PoolConfig):
+        super().__init__(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            http2=config.http2,
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._new_connections = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        previous_trace = request.extensions.get("trace")
+
+        # httpcore reports a TCP connect only when no pooled keep-alive connection could be reused
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                with self._lock:
+                    self._new_connections += 1
+            if previous_trace is not None:
+                await previous_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        with self._lock:
+            self._requests += 1
+        return await super().handle_async_request(request)
+
+    def stats(self) -> PoolStats:
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            return PoolStats(self._requests, self._new_connections, len(connections) - idle, idle)
+
+
+class BackgroundLoop:
+    """One long-lived event loop on a daemon thread.
+
+    Pooled connections belong to the loop that opened them, so every model call is run here
+    instead of on a per-rerun loop in Streamlit's script thread.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="agent-event-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+_lock = threading.Lock()
+_background_loop: Optional[BackgroundLoop] = None
+_transports: Dict[PoolConfig, InstrumentedTransport] = {}
+_agents: Dict[Tuple, object] = {}
+
+
+def get_background_loop() -> BackgroundLoop:
+    global _background_loop
+    with _lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+        return _background_loop
+
+
+def get_transport(config: PoolConfig) -> InstrumentedTransport:
+    with _lock:
+        if config not in _transports:
+            _transports[config] = InstrumentedTransport(config)
+        return _transports[config]
+
+
+def create_google_provider(api_key: Optional[str] = None, config: Optional[PoolConfig] = None):
+    """GoogleProvider whose genai client sends every request through the shared pooled transport"""
+    from google.genai import Client
+    from pydantic_ai.providers.google import GoogleProvider
+
+    config = config or PoolConfig.from_env()
+    http_options = {
+        # google-genai takes the per-request timeout in milliseconds
+        "timeout": int(config.read_timeout * 1000),
+        "async_client_args": {
+            "transport": get_transport(config),
+            "timeout": httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        },
+    }
+    client = Client(api_key=api_key or os.getenv("GOOGLE_API_KEY"), http_options=http_options)
+    return GoogleProvider(client=client)
+
+
+def get_agent(system_prompt: str, model_name: str = DEFAULT_MODEL, api_key: Optional[str] = None,
+              config: Optional[PoolConfig] = None):
+    """Return the process-wide Agent for this model/system prompt, creating it on first use"""
+    from pydantic_ai import Agent
+    from pydantic_ai.models.google import GoogleModel
+
+    config = config or PoolConfig.from_env()
+    key = (model_name, system_prompt, api_key, config)
+    with _lock:
+        agent = _agents.get(key)
+    if agent is None:
+        model = GoogleModel(model_name, provider=create_google_provider(api_key, config))
+        agent = Agent(model, system_prompt=system_prompt)
+        with _lock:
+            agent = _agents.setdefault(key, agent)
+    return agent
+
+
+def pool_stats(config: Optional[PoolConfig] = None) -> PoolStats:
+    """Connection counters for the shared transport"""
+    return get_transport(config or PoolConfig.from_env()).stats()
+
+
+def run_sync(agent, prompt: str, **run_kwargs):
+    """Like agent.run_sync, but on the shared background loop so pooled connections are reused"""
+    return get_background_loop().run(agent.run(prompt, **run_kwargs))
@@ -0,0 +1,247 @@
+# Streaming bulk ingestion of CSV / JSONL / Parquet files or folders into a Chroma collection
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from dedup import DedupReport, Deduplicator
+from metadata_facets import FacetIndex
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.getcwd(), "ingest_checkpoints.json")
+TEXT_FILE_EXTENSIONS = ('.txt', '.md', '.py', '.html', '.css', '.js', '.json', '.csv')
+SUPPORTED_FORMATS = ('csv', 'jsonl', 'parquet')
+
+
+def clean_metadata(metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Keep only values Chroma can store (str/int/float/bool), dropping empty and NaN values"""
+    cleaned = {}
+    for key, value in metadata.items():
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        if hasattr(value, "item"):
+            # numpy / pandas scalars -> plain Python values
+            value = value.item()
+        if isinstance(value, (str, int, float, bool)):
+            cleaned[str(key)] = value
+        else:
+            cleaned[str(key)] = str(value)
+    return cleaned or None
+
+
+def _make_row(record: Dict[str, Any], id_column: str, text_column: str, row_number: int) -> Dict[str, Any]:
+    doc_id = record.get(id_column)
+    text = record.get(text_column)
+    metadata = {k: v for k, v in record.items() if k not in (id_column, text_column)}
+    return {
+        "id": str(doc_id) if doc_id is not None and doc_id == doc_id else f"row_{row_number}",
+        "text": "" if text is None else str(text),
+        "metadata": clean_metadata(metadata),
+    }
+
+
+def iter_csv_rows(source, id_column="id", text_column="text", read_chunk_size=10_000) -> Iterator[Dict[str, Any]]:
+    import pandas as pd
+    row_number = 0
+    # chunksize makes pandas stream the file instead of loading it all at once
+    for frame in pd.read_csv(source, chunksize=read_chunk_size):
+        for record in frame.to_dict(orient="records"):
+            yield _make_row(record, id_column, text_column, row_number)
+            row_number += 1
+
+
+def iter_jsonl_rows(source, id_column="id", text_column="text") -> Iterator[Dict[str, Any]]:
+    if isinstance(source, (str, os.PathLike)):
+        handle = open(source, "r", encoding="utf-8")
+    else:
+        handle = io.TextIOWrapper(source, encoding="utf-8")
+    with handle:
+        row_number = 0
+        for line in handle:
+            if not line.strip():
+                continue
+            yield _make_row(json.loads(line), id_column, text_column, row_number)
+            row_number += 1
+
+
+def iter_parquet_rows(source, id_column="id", text_column="text", read_chunk_size=10_000) -> Iterator[Dict[str, Any]]:
+    import pyarrow.parquet as pq
+    row_number = 0
+    # Read one record batch at a time so memory is bounded by the batch size
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=read_chunk_size):
+        for record in batch.to_pylist():
+            yield _make_row(record, id_column, text_column, row_number)
+            row_number += 1
+
+
+def iter_folder_rows(folder: str) -> Iterator[Dict[str, Any]]:
+    """One document per text or PDF file; the relative path is the document ID"""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, folder)
+            extension = os.path.splitext(name)[1].lower()
+            if extension == '.pdf':
+                from PyPDF2 import PdfReader
+                reader = PdfReader(path)
+                text = "\n".join(page.extract_text() or "" for page in reader.pages)
+            elif extension in TEXT_FILE_EXTENSIONS:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            else:
+                continue
+            yield {
+                "id": relative_path,
+                "text": text,
+                "metadata": {"source": relative_path, "extension": extension.lstrip('.')},
+            }
+
+
+def iter_rows(source, file_format: str, id_column="id", text_column="text") -> Iterator[Dict[str, Any]]:
+    """Dispatch to the streaming reader for a file format"""
+    if file_format == 'csv':
+        return iter_csv_rows(source, id_column, text_column)
+    if file_format == 'jsonl':
+        return iter_jsonl_rows(source, id_column, text_column)
+    if file_format == 'parquet':
+        return iter_parquet_rows(source, id_column, text_column)
+    raise ValueError(f"Unsupported format '{file_format}'. Expected one of {SUPPORTED_FORMATS}")
+
+
+def source_fingerprint(name: str, data: Optional[bytes] = None) -> str:
+    """Stable key for a source so a re-run of the same input resumes its checkpoint"""
+    hasher = hashlib.sha256(name.encode("utf-8"))
+    if data is not None:
+        hasher.update(data)
+    return hasher.hexdigest()[:16]
+
+
+class IngestCheckpoint:
+    """JSON file recording how many rows of each (collection, source) have been committed"""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, int]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, state: Dict[str, int]):
+        # Write to a temp file and rename so a crash never leaves a half-written checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._load().get(key, 0)
+
+    def set(self, key: str, rows_committed: int):
+        with self._lock:
+            state = self._load()
+            state[key] = rows_committed
+            self._save(state)
+
+    def clear(self, key: str):
+        with self._lock:
+            state = self._load()
+            if state.pop(key, None) is not None:
+                self._save(state)
+
+
+@dataclass
+class IngestResult:
+    """Summary of a bulk ingestion run"""
+    rows_committed: int = 0
+    rows_resumed: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    # Rows left out because their text duplicates already stored content
+    dedup: DedupReport = field(default_factory=DedupReport)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.rows_committed / self.seconds if self.seconds else 0.0
+
+
+def _chunked(rows: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_rows(collection, rows: Iterable[Dict[str, Any]], embedder=None, chunk_size=256,
+                checkpoint: Optional[IngestCheckpoint] = None, checkpoint_key: Optional[str] = None,
+                progress_callback: Optional[Callable[[IngestResult], None]] = None,
+                deduplicator: Optional[Deduplicator] = None, skip_duplicates: bool = True,
+                facet_index: Optional[FacetIndex] = None) -> IngestResult:
+    """Upsert rows into a collection chunk by chunk, resuming after the last committed chunk.
+
+    With a deduplicator, rows whose text is an exact or near duplicate are skipped before they
+    are embedded and listed in result.dedup. With skip_duplicates=False every row is written and
+    the deduplicator only remembers it, so it stays in step with the collection. A facet index
+    has each chunk's metadata counted as it is written.
+    """
+    result = IngestResult()
+    start_row = checkpoint.get(checkpoint_key) if checkpoint and checkpoint_key else 0
+    start = time.perf_counter()
+    rows_seen = 0
+    for chunk in _chunked(rows, chunk_size):
+        # Skip chunks that were committed by a previous (interrupted) run
+        if rows_seen + len(chunk) <= start_row:
+            rows_seen += len(chunk)
+            result.rows_resumed += len(chunk)
+            continue
+        if rows_seen < start_row:
+            chunk = chunk[start_row - rows_seen:]
+            result.rows_resumed += start_row - rows_seen
+            rows_seen = start_row
+        chunk_rows = len(chunk)
+        if deduplicator is not None and skip_duplicates:
+            chunk = deduplicator.filter_rows(chunk, result.dedup)
+        elif deduplicator is not None:
+            deduplicator.remember_rows(chunk)
+        rows_seen += chunk_rows
+        if not chunk:
+            if checkpoint and checkpoint_key:
+                checkpoint.set(checkpoint_key, rows_seen)
+            continue
+        documents = [row["text"] for row in chunk]
+        metadatas = [row["metadata"] for row in chunk]
+        upsert_kwargs = {
+            "ids": [row["id"] for row in chunk],
+            "documents": documents,
+            # Chroma rejects empty metadata dicts, so rows without metadata are sent as None
+            "metadatas": metadatas if any(metadatas) else None,
+        }
+        if embedder is not None:
+            upsert_kwargs["embeddings"] = embedder.embed(documents)
+        if facet_index is not None:
+            facet_index.upsert(collection, upsert_kwargs["ids"], metadatas)
+        collection.upsert(**upsert_kwargs)
+        result.rows_committed += len(chunk)
+        result.chunks += 1
+        result.seconds = time.perf_counter() - start
+        if checkpoint and checkpoint_key:
+            checkpoint.set(checkpoint_key, rows_seen)
+        if progress_callback:
+            progress_callback(result)
+    result.seconds = time.perf_counter() - start
+    # Finished cleanly, so the next ingest of this source starts from the top again
+    if checkpoint and checkpoint_key:
+        checkpoint.clear(checkpoint_key)
+    return result
@@ -0,0 +1,111 @@
+# Bridge pydantic-ai's async streaming API to the sync generators st.write_stream expects
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Iterator, Optional
+
+
+@dataclass
+class StreamMetrics:
+    """Latency and throughput of a single streamed reply"""
+    time_to_first_token: Optional[float] = None
+    total_seconds: float = 0.0
+    output_tokens: int = 0
+    cancelled: bool = False
+
+    @property
+    def tokens_per_second(self) -> float:
+        # Generation rate after the first token arrived, which is what the user watches
+        generating = self.total_seconds - (self.time_to_first_token or 0.0)
+        return self.output_tokens / generating if generating > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["tokens_per_second"] = self.tokens_per_second
+        return data
+
+
+def format_metrics(metrics: dict) -> str:
+    """One-line caption for a reply's metrics dict"""
+    # Replies served by the response cache carry how they were matched instead of stream timings
+    if metrics.get("cached"):
+        if metrics.get("cache_match") == "semantic":
+            return f"⚡ Cached reply (similar question, similarity {metrics.get('similarity', 0.0):.2f})"
+        return "⚡ Cached reply (exact match)"
+    first_token = metrics.get("time_to_first_token")
+    parts = ["🆕 Fresh reply"]
+    parts.append(f"⏱️ First token {first_token:.2f}s" if first_token is not None else "⏱️ No tokens received")
+    parts.append(f"{metrics.get('tokens_per_second', 0.0):.1f} tokens/s")
+    parts.append(f"{metrics.get('total_seconds', 0.0):.1f}s total")
+    if metrics.get("cancelled"):
+        parts.append("⏹️ cancelled")
+    return " · ".join(parts)
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    # Same loop handling as Agent.run_sync, so the streamed path behaves like the blocking one
+    try:
+        loop = asyncio.get_event_loop()
+        if loop.is_closed():
+            raise RuntimeError("closed")
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop
+
+
+def _run(loop: asyncio.AbstractEventLoop, coro):
+    # A loop already running on another thread (e.g. agent_factory's background loop) is driven thread-safely
+    if loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    return loop.run_until_complete(coro)
+
+
+async def _stream_deltas(agent, prompt: str, metrics: StreamMetrics, message_history=None,
+                         result_holder: Optional[dict] = None) -> AsyncIterator[str]:
+    async with agent.run_stream(prompt, message_history=message_history) as result:
+        # debounce_by=None hands over every chunk as it arrives instead of grouping them
+        async for delta in result.stream_text(delta=True, debounce_by=None):
+            yield delta
+        metrics.output_tokens = result.usage().output_tokens
+        if result_holder is not None:
+            result_holder["result"] = result
+
+
+def stream_agent_reply(agent, prompt: str, metrics: StreamMetrics, message_history=None,
+                       on_delta=None, result_holder: Optional[dict] = None,
+                       loop: Optional[asyncio.AbstractEventLoop] = None) -> Iterator[str]:
+    """Yield text deltas from the agent, recording time-to-first-token and tokens/sec in metrics.
+
+    Closing the generator early (e.g. Streamlit stopping the script because the user sent a new
+    message) cancels the underlying model request.
+    """
+    loop = loop or _get_event_loop()
+    deltas = _stream_deltas(agent, prompt, metrics, message_history, result_holder)
+    started = time.perf_counter()
+    finished = False
+    delta_count = 0
+    try:
+        while True:
+            try:
+                delta = _run(loop, deltas.__anext__())
+            except StopAsyncIteration:
+                finished = True
+                break
+            if metrics.time_to_first_token is None:
+                metrics.time_to_first_token = time.perf_counter() - started
+            delta_count += 1
+            if on_delta:
+                on_delta(delta)
+            yield delta
+    except GeneratorExit:
+        metrics.cancelled = True
+        raise
+    finally:
+        metrics.total_seconds = time.perf_counter() - started
+        # Usage is only reported once the stream completes; fall back to the chunk count
+        if not metrics.output_tokens:
+            metrics.output_tokens = delta_count
+        if not finished:
+            # Closing the async generator exits run_stream, which aborts the HTTP stream
+            _run(loop, deltas.aclose())
@@ -0,0 +1,166 @@
+# Export / import of Chroma collections as columnar snapshots that keep the stored embeddings
+# Examples:
+#   python collection_snapshot.py export krish_collection snapshots/krish_collection --dtype float16
+#   python collection_snapshot.py import snapshots/krish_collection --db-path ./prod_db --collection krish_collection
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import numpy as np
+
+from hnsw_tuning import HnswParams, get_or_create_collection
+
+MANIFEST_FILE = "manifest.json"
+RECORDS_FILE = "records.parquet"
+EMBEDDINGS_FILE = "embeddings.npy"
+DTYPES = ("float32", "float16")
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class SnapshotResult:
+    collection: str
+    path: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def export_collection(collection, path: str, dtype: str = "float32", batch_size: int = DEFAULT_BATCH_SIZE,
+                      progress_callback=None) -> SnapshotResult:
+    """Write ids, documents and metadata to Parquet and the embeddings to an .npy matrix.
+
+    Pages are streamed with limit/offset, so memory stays at one batch plus the memory-mapped matrix.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    started = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    total = collection.count()
+    # Metadata keys differ per document, so each dict is stored as a JSON string column
+    schema = pa.schema([("id", pa.string()), ("document", pa.string()), ("metadata", pa.string())])
+    matrix = None
+    rows = 0
+    with pq.ParquetWriter(os.path.join(path, RECORDS_FILE), schema, compression="zstd") as writer:
+        while rows < total:
+            page = collection.get(limit=batch_size, offset=rows, include=["documents", "metadatas", "embeddings"])
+            if not page["ids"]:
+                break
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(os.path.join(path, EMBEDDINGS_FILE), mode="w+",
+                                                   dtype=dtype, shape=(total, embeddings.shape[1]))
+            count = min(len(page["ids"]), total - rows)
+            matrix[rows:rows + count] = embeddings[:count]
+            metadatas = page["metadatas"] or [None] * count
+            writer.write_table(pa.table({
+                "id": page["ids"][:count],
+                "document": (page["documents"] or [None] * count)[:count],
+                "metadata": [json.dumps(metadata) if metadata else None for metadata in metadatas[:count]],
+            }, schema=schema))
+            rows += count
+            if progress_callback:
+                progress_callback(rows, total)
+    if matrix is not None:
+        matrix.flush()
+        del matrix
+    manifest = {
+        "collection": collection.name,
+        "metadata": collection.metadata,
+        "hnsw": HnswParams.from_collection(collection).to_configuration()["hnsw"],
+        "rows": rows,
+        "dtype": dtype,
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return SnapshotResult(collection.name, path, rows, time.perf_counter() - started)
+
+
+def read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def import_snapshot(client, path: str, collection_name: Optional[str] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE, progress_callback=None):
+    """Upsert a snapshot's rows with their stored vectors; returns (collection, SnapshotResult).
+
+    The collection is created with the snapshot's HNSW settings if it does not exist yet.
+    """
+    import pyarrow.parquet as pq
+
+    started = time.perf_counter()
+    manifest = read_manifest(path)
+    name = collection_name or manifest["collection"]
+    collection = get_or_create_collection(client, name, HnswParams(**manifest["hnsw"]), metadata=manifest["metadata"])
+    rows = manifest["rows"]
+    if rows == 0:
+        return collection, SnapshotResult(name, path, 0, time.perf_counter() - started)
+
+    # Memory-mapped: only the rows of the current batch are read from disk
+    matrix = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+    offset = 0
+    for batch in pq.ParquetFile(os.path.join(path, RECORDS_FILE)).iter_batches(batch_size=batch_size):
+        columns = batch.to_pydict()
+        count = len(columns["id"])
+        metadatas = [json.loads(metadata) if metadata else None for metadata in columns["metadata"]]
+        collection.upsert(
+            ids=columns["id"],
+            documents=columns["document"],
+            metadatas=metadatas if any(metadatas) else None,
+            embeddings=np.asarray(matrix[offset:offset + count], dtype=np.float32),
+        )
+        offset += count
+        if progress_callback:
+            progress_callback(offset, rows)
+    return collection, SnapshotResult(name, path, offset, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import Chroma collection snapshots without re-embedding")
+    parser.add_argument("--db-path", default=os.path.join(os.getcwd(), "krish_demo_db"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write a collection to a snapshot folder")
+    export_parser.add_argument("collection")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--dtype", choices=DTYPES, default="float32",
+                               help="float16 halves the matrix size at a small precision cost")
+    import_parser = commands.add_parser("import", help="Upsert a snapshot folder into a collection")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--collection", help="Target collection (default: the exported name)")
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=args.db_path)
+
+    def progress(done, total):
+        print(f"\r⏳ {done:,}/{total:,} rows", end="", flush=True)
+
+    if args.command == "export":
+        result = export_collection(client.get_collection(args.collection), args.path, args.dtype,
+                                   args.batch_size, progress)
+        action = "Exported"
+    else:
+        _, result = import_snapshot(client, args.path, args.collection, args.batch_size, progress)
+        action = "Imported"
+    print(f"\n✅ {action} {result.rows:,} rows of '{result.collection}' in {result.seconds:.1f}s "
+          f"({result.rows_per_second:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
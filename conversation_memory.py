@@ -0,0 +1,131 @@
+# Token-budgeted multi-turn memory with an incrementally rolled-up summary of older turns
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from pdf_pipeline import load_tokenizer
+
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_SUMMARY_TOKEN_BUDGET = 300
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+    # Counted once when the turn is added, so reruns never re-tokenize the whole conversation
+    tokens: int
+
+
+def summary_prompt(previous_summary: str, turns: List[Turn], max_words: int) -> str:
+    """Prompt asking a model to fold new turns into the running summary"""
+    transcript = "\n".join(f"User: {turn.user}\nAssistant: {turn.assistant}" for turn in turns)
+    return (
+        f"Current summary of the conversation:\n{previous_summary or '(none yet)'}\n\n"
+        f"New conversation turns:\n{transcript}\n\n"
+        f"Rewrite the summary so it also covers the new turns. Keep names, facts, decisions and open "
+        f"questions the user may refer back to. Use at most {max_words} words and reply with the summary only."
+    )
+
+
+class ConversationMemory:
+    """Keeps recent turns verbatim within a token budget and older turns as a running summary"""
+
+    def __init__(self, system_prompt: str, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 summary_token_budget: int = DEFAULT_SUMMARY_TOKEN_BUDGET, tokenizer=None):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.tokenizer = tokenizer or load_tokenizer()
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_turns = 0
+        self.system_tokens = self.count_tokens(system_prompt)
+        self.last_prompt_tokens = 0
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids) if text else 0
+
+    def add_turn(self, user: str, assistant: str):
+        self.turns.append(Turn(user, assistant, self.count_tokens(user) + self.count_tokens(assistant)))
+
+    def _turn_budget(self, prompt_tokens: int) -> int:
+        return self.token_budget - self.system_tokens - self.summary_tokens - prompt_tokens
+
+    def _window_start(self, turn_budget: int) -> int:
+        """Index of the oldest turn that still fits, walking back from the newest"""
+        used = 0
+        start = len(self.turns)
+        for index in range(len(self.turns) - 1, -1, -1):
+            used += self.turns[index].tokens
+            if used > turn_budget:
+                break
+            start = index
+        return start
+
+    def build_history(self, prompt: str):
+        """pydantic-ai message_history for the next prompt, trimmed to the token budget"""
+        from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+        prompt_tokens = self.count_tokens(prompt)
+        start = self._window_start(self._turn_budget(prompt_tokens))
+        window = self.turns[start:]
+        self.last_prompt_tokens = (self.system_tokens + self.summary_tokens + prompt_tokens
+                                   + sum(turn.tokens for turn in window))
+        if not window and not self.summary:
+            # Nothing to remember yet - let the agent add its own system prompt
+            return None
+
+        # With a non-empty history pydantic-ai does not add the system prompt, so it goes first
+        system_parts = [SystemPromptPart(self.system_prompt)]
+        if self.summary:
+            system_parts.append(SystemPromptPart(f"Summary of the earlier conversation:\n{self.summary}"))
+        history = [ModelRequest(parts=system_parts)]
+        for turn in window:
+            history.append(ModelRequest(parts=[UserPromptPart(turn.user)]))
+            history.append(ModelResponse(parts=[TextPart(turn.assistant)]))
+        return history
+
+    def turns_to_roll_up(self, reserve_tokens: Optional[int] = None) -> int:
+        """How many of the oldest turns no longer fit next to a typical new prompt"""
+        # Leave a quarter of the budget free for the next prompt by default
+        reserve = self.token_budget // 4 if reserve_tokens is None else reserve_tokens
+        turn_budget = self.token_budget - self.system_tokens - self.summary_token_budget - reserve
+        return self._window_start(turn_budget)
+
+    def roll_up(self, summarize: Callable[[str], str], reserve_tokens: Optional[int] = None) -> int:
+        """Fold turns that fell out of the window into the summary; returns how many were folded.
+
+        Only the newly evicted turns are sent to the summarizer together with the cached summary,
+        so the cost of a roll-up does not grow with the length of the conversation.
+        """
+        count = self.turns_to_roll_up(reserve_tokens)
+        if count == 0:
+            return 0
+        evicted = self.turns[:count]
+        max_words = max(int(self.summary_token_budget * 0.75), 20)
+        try:
+            summary = summarize(summary_prompt(self.summary, evicted, max_words)).strip()
+        except Exception:
+            # Fall back to keeping the tail of a plain transcript if the summarizer is unavailable
+            transcript = " ".join(f"User: {t.user} Assistant: {t.assistant}" for t in evicted)
+            summary = f"{self.summary} {transcript}".strip()
+        self.summary = self._truncate(summary, self.summary_token_budget)
+        self.summary_tokens = self.count_tokens(self.summary)
+        self.turns = self.turns[count:]
+        self.summarized_turns += count
+        return count
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        # Keep the most recent part of the text, cut on a token boundary
+        start_offset = encoding.offsets[len(encoding.ids) - max_tokens][0]
+        return text[start_offset:]
+
+    def clear(self):
+        self.turns = []
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_turns = 0
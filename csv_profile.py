@@ -0,0 +1,209 @@
+# Single-pass, memory-bounded CSV profiling: preview rows, per-column stats, approximate distinct counts
+import io
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PREVIEW_ROWS = 100
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_SAMPLE_ROWS = 1000
+ENGINES = ("pandas", "pyarrow")
+# pyarrow reads this many bytes per record batch
+PYARROW_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2**precision one-byte registers (4 KB at the default precision 12).
+
+    The standard error is about 1.04 / sqrt(2**precision), i.e. ~1.6% at precision 12.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Add 64-bit hashes (e.g. from pd.util.hash_pandas_object)"""
+        if not len(hashes):
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        remainder = hashes << np.uint64(self.precision)
+        # frexp's exponent is the bit length; exact enough for a sketch even where float64 rounds
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        rank = np.where(remainder == 0, 64 - self.precision + 1, 64 - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+@dataclass
+class ColumnStats:
+    name: str
+    dtypes: Set[str] = field(default_factory=set)
+    count: int = 0
+    nulls: int = 0
+    minimum: Any = None
+    maximum: Any = None
+    sketch: HyperLogLog = field(default_factory=HyperLogLog)
+
+    @property
+    def dtype(self) -> str:
+        """Type that holds every chunk's values, e.g. int64 chunks plus float64 chunks -> float64"""
+        if len(self.dtypes) == 1:
+            return next(iter(self.dtypes))
+        try:
+            return str(np.result_type(*[np.dtype(dtype) for dtype in self.dtypes]))
+        except TypeError:
+            return "object"
+
+    @property
+    def distinct(self) -> int:
+        return self.sketch.count()
+
+    def update(self, column: pd.Series):
+        self.dtypes.add(str(column.dtype))
+        values = column.dropna()
+        self.count += len(values)
+        self.nulls += len(column) - len(values)
+        if not len(values):
+            return
+        self.sketch.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            # Mixed object columns compare as text
+            values = values.astype(str)
+        low, high = values.min(), values.max()
+        try:
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        except TypeError:
+            # A column that changed from numbers to text part-way through
+            self.minimum = min(str(self.minimum), str(low))
+            self.maximum = max(str(self.maximum), str(high))
+
+
+@dataclass
+class CsvProfile:
+    rows: int
+    columns: List[ColumnStats]
+    sample: Optional[pd.DataFrame]
+    bytes_read: int
+    seconds: float
+    # Reader that produced the profile; pandas when pyarrow gave up part-way (see profile_csv)
+    engine: str = "pandas"
+
+    @property
+    def shape(self):
+        return self.rows, len(self.columns)
+
+    @property
+    def memory_bytes(self) -> int:
+        sample_bytes = int(self.sample.memory_usage(deep=True).sum()) if self.sample is not None else 0
+        return sample_bytes + sum(len(column.sketch.registers) for column in self.columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([{
+            "Column": column.name,
+            "Type": column.dtype,
+            "Non-null": column.count,
+            "Nulls": column.nulls,
+            "Distinct (approx.)": column.distinct,
+            "Min": None if column.minimum is None else str(column.minimum),
+            "Max": None if column.maximum is None else str(column.maximum),
+        } for column in self.columns])
+
+
+def _as_stream(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+
+def csv_preview(source, rows: int = DEFAULT_PREVIEW_ROWS) -> pd.DataFrame:
+    """The first rows only; the rest of the file is never read"""
+    stream = _as_stream(source)
+    try:
+        return pd.read_csv(stream, nrows=rows)
+    finally:
+        if hasattr(stream, "seek"):
+            stream.seek(0)
+
+
+def iter_csv_chunks(source, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: str = "pandas") -> Iterator[pd.DataFrame]:
+    """DataFrames of at most chunk_rows rows (pandas) or one record batch (pyarrow) each.
+
+    pyarrow infers column types from the first block only, so a later block whose values do not
+    fit them (e.g. text in a column that started out numeric) raises pyarrow.ArrowInvalid.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    stream = _as_stream(source)
+    if engine == "pyarrow":
+        import pyarrow.csv as pa_csv
+        reader = pa_csv.open_csv(stream, read_options=pa_csv.ReadOptions(block_size=PYARROW_BLOCK_SIZE),
+                                 # Empty fields are nulls in every column, as they are for pandas
+                                 convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+        for batch in reader:
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(stream, chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+def profile_csv(source, chunk_rows: int = DEFAULT_CHUNK_ROWS, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                engine: str = "pandas", seed: int = 0,
+                progress_callback: Optional[Callable[[int, int], None]] = None) -> CsvProfile:
+    """Shape, per-column stats and a uniform random sample of rows, in one streaming pass.
+
+    Memory is one chunk plus sample_rows rows plus a 4 KB sketch per column, whatever the file size.
+    progress_callback receives (bytes read so far, total bytes or 0 if unknown). If the pyarrow
+    reader hits a block whose types differ from the first one, the file is profiled again with
+    pandas and the result's engine says so.
+    """
+    stream = _as_stream(source)
+    if engine != "pyarrow":
+        return _profile_stream(stream, chunk_rows, sample_rows, engine, seed, progress_callback)
+    import pyarrow as pa
+    try:
+        return _profile_stream(stream, chunk_rows, sample_rows, engine, seed, progress_callback)
+    except pa.ArrowInvalid:
+        stream.seek(0)
+        return _profile_stream(stream, chunk_rows, sample_rows, "pandas", seed, progress_callback)
+
+
+def _profile_stream(stream, chunk_rows: int, sample_rows: int, engine: str, seed: int,
+                    progress_callback: Optional[Callable[[int, int], None]]) -> CsvProfile:
+    started = time.perf_counter()
+    total_bytes = getattr(stream, "size", None) or (len(stream.getbuffer()) if hasattr(stream, "getbuffer") else 0)
+    rng = np.random.default_rng(seed)
+    columns: Dict[str, ColumnStats] = {}
+    sample: List[tuple] = []
+    rows = 0
+    for chunk in iter_csv_chunks(stream, chunk_rows, engine):
+        for name in chunk.columns:
+            columns.setdefault(name, ColumnStats(str(name))).update(chunk[name])
+        if sample_rows:
+            # Reservoir sampling (Algorithm R): row i replaces a random slot with probability k / (i + 1)
+            fill = max(min(sample_rows - rows, len(chunk)), 0)
+            sample.extend(chunk.iloc[:fill].itertuples(index=False, name=None))
+            slots = rng.integers(0, np.arange(rows + fill, rows + len(chunk)) + 1)
+            for position in np.flatnonzero(slots < sample_rows):
+                sample[slots[position]] = tuple(chunk.iloc[fill + position])
+        rows += len(chunk)
+        if progress_callback:
+            progress_callback(stream.tell() if hasattr(stream, "tell") else 0, total_bytes)
+    bytes_read = stream.tell() if hasattr(stream, "tell") else 0
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    # Column types are inferred once from the sampled values
+    sample_frame = pd.DataFrame(sample, columns=[column.name for column in columns.values()]) if sample else None
+    return CsvProfile(rows, list(columns.values()), sample_frame, bytes_read, time.perf_counter() - started, engine)
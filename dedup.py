@@ -0,0 +1,251 @@
+# Exact (normalized content hash) and near-duplicate (MinHash + LSH) detection for ingestion
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+SHINGLE_WORDS = 3
+SCAN_PAGE_SIZE = 1000
+# Largest prime below 2**32, so permuted hashes fit in uint32 signatures
+_PRIME = 4294967291
+# Skipped items listed in a report; the counters keep counting beyond this
+MAX_REPORTED = 1000
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalized, case-folded text with all whitespace runs collapsed"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text or "")).strip().casefold()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _shingle_hashes(normalized: str) -> np.ndarray:
+    words = normalized.split(" ")
+    if len(words) >= SHINGLE_WORDS:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    else:
+        # Too short for word shingles - fall back to character 4-grams
+        shingles = {normalized[i:i + 4] for i in range(max(len(normalized) - 3, 1))}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles))
+
+
+@dataclass
+class DuplicateHit:
+    id: str
+    kind: str  # "exact" or "near"
+    duplicate_of: str
+    similarity: float
+
+
+@dataclass
+class DedupReport:
+    exact: int = 0
+    near: int = 0
+    skipped: List[DuplicateHit] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.exact + self.near
+
+    def record(self, hit: DuplicateHit):
+        setattr(self, hit.kind, getattr(self, hit.kind) + 1)
+        if len(self.skipped) < MAX_REPORTED:
+            self.skipped.append(hit)
+
+
+class Deduplicator:
+    """Remembers every accepted text and flags later exact or near-duplicate ones.
+
+    Near duplicates are found with MinHash signatures over word 3-gram shingles; LSH banding
+    keeps the lookup sub-linear, and candidates are confirmed by their estimated Jaccard similarity.
+    A text is never a duplicate of its own id, so re-ingesting an id (e.g. to update its metadata)
+    always goes through and replaces what was remembered for it.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 bands: int = DEFAULT_BANDS, near_duplicates: bool = True, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.near_duplicates = near_duplicates
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        # Every id holding a text, so forgetting one id keeps the others' matches
+        self._hashes: Dict[str, List[str]] = defaultdict(list)
+        self._id_hashes: Dict[str, str] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._id_hashes)
+
+    def signature(self, normalized: str) -> np.ndarray:
+        shingles = _shingle_hashes(normalized)
+        # a * h + b stays below 2**64 because a, b and h are all below 2**32
+        permuted = (np.outer(shingles, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterator[bytes]:
+        for band in range(self.bands):
+            yield signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+
+    def check(self, doc_id: str, text: str, remember: bool = True) -> Optional[DuplicateHit]:
+        """Return why text is a duplicate, or None after remembering it as new content.
+
+        With remember=False nothing changes, for writers that remember the text (add_existing)
+        only once it has been stored.
+        """
+        normalized = normalize_text(text)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        with self._lock:
+            originals = [original for original in self._hashes.get(digest, ()) if original != doc_id]
+            if originals:
+                return DuplicateHit(doc_id, "exact", originals[0], 1.0)
+        signature = self.signature(normalized) if self.near_duplicates and normalized else None
+        with self._lock:
+            if signature is not None:
+                candidates = {candidate for band, key in enumerate(self._band_keys(signature))
+                              for candidate in self._buckets[band].get(key, ())}
+                candidates.discard(doc_id)
+                best_id, best = None, 0.0
+                for candidate in candidates:
+                    similarity = float(np.mean(self._signatures[candidate] == signature))
+                    if similarity > best:
+                        best_id, best = candidate, similarity
+                if best_id is not None and best >= self.threshold:
+                    return DuplicateHit(doc_id, "near", best_id, best)
+            if remember:
+                self._remember(doc_id, digest, signature)
+        return None
+
+    def _remember(self, doc_id: str, digest: str, signature: Optional[np.ndarray]):
+        self._forget(doc_id)
+        self._hashes[digest].append(doc_id)
+        self._id_hashes[doc_id] = digest
+        if signature is not None:
+            self._signatures[doc_id] = signature
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band][key].append(doc_id)
+
+    def _forget(self, doc_id: str):
+        digest = self._id_hashes.pop(doc_id, None)
+        if digest is None:
+            return
+        holders = self._hashes[digest]
+        holders.remove(doc_id)
+        if not holders:
+            del self._hashes[digest]
+        signature = self._signatures.pop(doc_id, None)
+        if signature is not None:
+            for band, key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band][key]
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def forget(self, doc_ids: Iterable[str]):
+        """Drop deleted documents so their text no longer counts as stored"""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._forget(doc_id)
+
+    def add_existing(self, doc_id: str, text: str):
+        """Remember already stored content without checking it"""
+        normalized = normalize_text(text)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        signature = self.signature(normalized) if self.near_duplicates and normalized else None
+        with self._lock:
+            self._remember(doc_id, digest, signature)
+
+    def seed_from_collection(self, collection):
+        """Remember every document already in a collection (documents only, paged)"""
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=SCAN_PAGE_SIZE, offset=offset)
+            for doc_id, document in zip(page["ids"], page["documents"] or []):
+                if document:
+                    self.add_existing(doc_id, document)
+            if len(page["ids"]) < SCAN_PAGE_SIZE:
+                return
+            offset += SCAN_PAGE_SIZE
+
+    def remember_rows(self, rows: Iterable[Dict[str, Any]]):
+        """Remember every row's text without checking it, for ingestion with deduplication off"""
+        for row in rows:
+            self.add_existing(row["id"], row["text"])
+
+    def filter_rows(self, rows: Iterable[Dict[str, Any]], report: DedupReport) -> List[Dict[str, Any]]:
+        """Keep the rows ({"id", "text", ...}) whose text is new, recording the rest in report"""
+        kept = []
+        for row in rows:
+            hit = self.check(row["id"], row["text"])
+            if hit is None:
+                kept.append(row)
+            else:
+                report.record(hit)
+        return kept
+
+
+class DedupIndex:
+    """One Deduplicator per collection, seeded from the stored documents on first use.
+
+    Adds, upserts and deletes are applied to the seeded deduplicator as they happen; only writers
+    that replace a collection wholesale (rebuild, snapshot import) call invalidate() to reseed.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        # name -> (collection class it was seeded from, deduplicator)
+        self._deduplicators: Dict[str, Tuple[type, Deduplicator]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection) -> Deduplicator:
+        with self._lock:
+            source, deduplicator = self._deduplicators.get(collection.name, (None, None))
+        if deduplicator is None or source is not type(collection):
+            # Never seeded, or seeded from the other backend's collection of the same name
+            deduplicator = Deduplicator(self.threshold)
+            deduplicator.seed_from_collection(collection)
+            with self._lock:
+                self._deduplicators[collection.name] = (type(collection), deduplicator)
+        # The threshold only affects later checks, so it can change without reseeding
+        deduplicator.threshold = self.threshold
+        return deduplicator
+
+    def peek(self, collection) -> Optional[Deduplicator]:
+        """The deduplicator already seeded for this collection, or None (never seeds)"""
+        with self._lock:
+            source, deduplicator = self._deduplicators.get(collection.name, (None, None))
+        return deduplicator if source is type(collection) else None
+
+    def add(self, collection, doc_id: str, text: str):
+        """Remember a document added without a check (ignored until the collection has been seeded)"""
+        deduplicator = self.peek(collection)
+        if deduplicator is not None:
+            deduplicator.add_existing(doc_id, text)
+
+    def remove(self, collection, doc_ids: Iterable[str]):
+        """Forget deleted documents (ignored until the collection has been seeded)"""
+        deduplicator = self.peek(collection)
+        if deduplicator is not None:
+            deduplicator.forget(doc_ids)
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            self._deduplicators.pop(collection_name, None)
@@ -0,0 +1,191 @@
+# Persistent, content-addressed embedding cache backed by SQLite
+import hashlib
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from embedding_engine import DEFAULT_TASK_TYPE
+
+DEFAULT_CACHE_PATH = os.path.join(os.getcwd(), "embedding_cache.sqlite3")
+# SQLite limits the number of bound parameters per statement, so lookups are chunked
+SQLITE_CHUNK_SIZE = 500
+
+
+def cache_key(model: str, task_type: str, text: str) -> bytes:
+    """Content address for a text embedded by a given model and task type"""
+    hasher = hashlib.sha256()
+    for part in (model, task_type or "", text):
+        data = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    return hasher.digest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss/eviction counters for the current process"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """On-disk embedding cache with compact float16/float32 storage and size-bounded LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=512 * 1024 * 1024, dtype="float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError("dtype must be 'float16' or 'float32'")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # Streamlit runs sessions on different threads, so the connection is shared behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        row = self._conn.execute(
+            "SELECT COALESCE(MAX(last_access), 0), COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings"
+        ).fetchone()
+        # A logical clock orders entries for LRU eviction without relying on wall time
+        self._clock, self._total_bytes, self._entries = row
+
+    def __len__(self):
+        return self._entries
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total_bytes
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors for texts (None for misses), in input order"""
+        keys = [cache_key(model, task_type, text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_CHUNK_SIZE):
+                chunk = list(set(keys[start:start + SQLITE_CHUNK_SIZE]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+            if found:
+                # Touch hits so they move to the most-recently-used end
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(self._clock, key) for key in found],
+                )
+                self._conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.stats.hits += hits
+            self.stats.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, task_type: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors for texts, evicting least-recently-used entries if over budget"""
+        with self._lock:
+            self._clock += 1
+            rows = {}
+            for text, vector in zip(texts, vectors):
+                blob = np.asarray(vector, dtype=self.dtype).tobytes()
+                rows[cache_key(model, task_type, text)] = (self.dtype, blob, self._clock)
+            keys = list(rows)
+            # Account for entries being overwritten so the byte total stays accurate
+            for start in range(0, len(keys), SQLITE_CHUNK_SIZE):
+                chunk = keys[start:start + SQLITE_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                existing_bytes, existing_count = self._conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchone()
+                self._total_bytes -= existing_bytes
+                self._entries -= existing_count
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(key, dtype, blob, clock) for key, (dtype, blob, clock) in rows.items()],
+            )
+            self._total_bytes += sum(len(blob) for _, blob, _ in rows.values())
+            self._entries += len(rows)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        while self._total_bytes > self.max_bytes and self._entries > 0:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT ?", (SQLITE_CHUNK_SIZE,)
+            ).fetchall()
+            evict = []
+            for key, nbytes in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                evict.append((key,))
+                self._total_bytes -= nbytes
+                self._entries -= 1
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evict)
+            self.stats.evictions += len(evict)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._total_bytes = 0
+            self._entries = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder:
+    """Embedding engine front-end that only sends cache misses to the model"""
+
+    def __init__(self, engine, cache: EmbeddingCache):
+        self.engine = engine
+        self.cache = cache
+
+    @property
+    def model_name(self) -> str:
+        return self.engine.model_name
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def embed(self, texts: Iterable[str], task_type: str = DEFAULT_TASK_TYPE) -> List[List[float]]:
+        """Embed texts in input order, reusing cached vectors where possible"""
+        texts = list(texts)
+        vectors = self.cache.get_many(self.model_name, task_type, texts)
+        # Embed each distinct missing text once, even if it repeats in the input
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            fresh = self.engine.embed(missing, task_type=task_type)
+            self.cache.put_many(self.model_name, task_type, missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            vectors = [vector if vector is not None else by_text[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_one(self, text: str, task_type: str = DEFAULT_TASK_TYPE) -> List[float]:
+        return self.embed([text], task_type=task_type)[0]
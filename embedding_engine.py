@@ -0,0 +1,261 @@
+# Batched, concurrent embedding engine used by the embedding and vector store demos
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_EXCEPTIONS = (
+        google_exceptions.ResourceExhausted,   # 429 - rate limited / quota
+        google_exceptions.ServiceUnavailable,  # 503
+        google_exceptions.DeadlineExceeded,    # 504
+        google_exceptions.InternalServerError, # 500
+    )
+except ImportError:
+    RETRYABLE_EXCEPTIONS = ()
+
+# The Gemini batch embedding endpoint accepts at most 100 texts per request
+GEMINI_MAX_BATCH_SIZE = 100
+DEFAULT_TASK_TYPE = "retrieval_document"
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+# "default" is Chroma's local all-MiniLM-L6-v2 ONNX model, "local" the deterministic stand-in
+EMBEDDING_BACKENDS = ("default", "gemini", "local")
+
+
+class GeminiEmbeddingModel:
+    """Embedding model backed by Google's Gemini embedding API"""
+
+    def __init__(self, model=GEMINI_EMBEDDING_MODEL, api_key=None):
+        if not GENAI_AVAILABLE:
+            raise ImportError("google-generativeai not installed. Run: pip install google-generativeai")
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.name = model
+        self.max_batch_size = GEMINI_MAX_BATCH_SIZE
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> List[List[float]]:
+        # Passing a list as content sends a single batch request and returns one vector per text
+        result = genai.embed_content(model=self.name, content=list(texts), task_type=task_type)
+        return result['embedding']
+
+
+class ChromaEmbeddingModel:
+    """Adapter exposing a ChromaDB embedding function (e.g. the default local model) as a model"""
+
+    def __init__(self, embedding_function, name=None, max_batch_size=GEMINI_MAX_BATCH_SIZE):
+        self.embedding_function = embedding_function
+        if name is None:
+            try:
+                name = f"chroma-{embedding_function.name()}"
+            except Exception:
+                name = f"chroma-{type(embedding_function).__name__}"
+        self.name = name
+        self.max_batch_size = max_batch_size
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> List[List[float]]:
+        # Chroma functions may return numpy arrays; convert to plain floats for storage and caching
+        return [[float(v) for v in vector] for vector in self.embedding_function(list(texts))]
+
+
+class LocalEmbeddingModel:
+    """Deterministic offline stand-in model (feature hashing) for tests and benchmarks"""
+
+    def __init__(self, dimensions=768, latency_seconds=0.0, name=None, max_batch_size=GEMINI_MAX_BATCH_SIZE):
+        self.dimensions = dimensions
+        # Simulated network round-trip per batch so concurrency effects show up in benchmarks
+        self.latency_seconds = latency_seconds
+        self.name = name or f"local-hash-{dimensions}"
+        self.max_batch_size = max_batch_size
+
+    def embed_text(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        # L2-normalise so cosine and dot-product distances behave like a real model
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> List[List[float]]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [self.embed_text(text) for text in texts]
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Return True for rate-limit and transient server errors that are worth retrying"""
+    if RETRYABLE_EXCEPTIONS and isinstance(error, RETRYABLE_EXCEPTIONS):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "rate limit", "resource exhausted", "quota", "503", "unavailable"))
+
+
+@dataclass
+class EmbeddingStats:
+    """Counters collected while embedding"""
+    texts: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+
+class EmbeddingEngine:
+    """Embed many texts in request-sized batches, concurrently, with retry/backoff"""
+
+    def __init__(self, model, batch_size=None, max_concurrency=4, max_retries=5,
+                 base_delay=1.0, max_delay=30.0):
+        self.model = model
+        model_limit = getattr(model, "max_batch_size", None) or GEMINI_MAX_BATCH_SIZE
+        self.batch_size = min(batch_size or model_limit, model_limit)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = EmbeddingStats()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self.model.name
+
+    def _embed_with_retry(self, batch: List[str], task_type: str) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                vectors = self.model.embed_batch(batch, task_type=task_type)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Model returned {len(vectors)} embeddings for {len(batch)} texts")
+                with self._stats_lock:
+                    self.stats.batches += 1
+                return vectors
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                # Exponential backoff with full jitter so concurrent workers don't retry in lockstep
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+                attempt += 1
+                with self._stats_lock:
+                    self.stats.retries += 1
+
+    def _batches(self, texts: Iterable[str]) -> Iterator[List[str]]:
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_embed_batches(self, texts: Iterable[str], task_type: str = DEFAULT_TASK_TYPE) -> Iterator[List[List[float]]]:
+        """Yield one list of vectors per batch, in input order, with bounded work in flight"""
+        start = time.perf_counter()
+        # Keep a couple of batches queued per worker; the input iterable is consumed lazily
+        max_in_flight = self.max_concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending = deque()
+            for batch in self._batches(texts):
+                pending.append((len(batch), executor.submit(self._embed_with_retry, batch, task_type)))
+                if len(pending) >= max_in_flight:
+                    count, future = pending.popleft()
+                    yield self._collect(count, future, start)
+            while pending:
+                count, future = pending.popleft()
+                yield self._collect(count, future, start)
+
+    def _collect(self, count, future, start) -> List[List[float]]:
+        vectors = future.result()
+        with self._stats_lock:
+            self.stats.texts += count
+            self.stats.seconds = time.perf_counter() - start
+        return vectors
+
+    def embed(self, texts: Iterable[str], task_type: str = DEFAULT_TASK_TYPE) -> List[List[float]]:
+        """Embed all texts and return the vectors in the same order as the input"""
+        embeddings = []
+        for vectors in self.iter_embed_batches(texts, task_type=task_type):
+            embeddings.extend(vectors)
+        return embeddings
+
+    def embed_one(self, text: str, task_type: str = DEFAULT_TASK_TYPE) -> List[float]:
+        return self._embed_with_retry([text], task_type)[0]
+
+
+def benchmark_engine(engine: EmbeddingEngine, n_texts=2000, words_per_text=40, seed=0) -> EmbeddingStats:
+    """Embed a synthetic corpus and return the engine's throughput stats"""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    texts = (" ".join(rng.choice(vocabulary) for _ in range(words_per_text)) for _ in range(n_texts))
+    engine.stats = EmbeddingStats()
+    engine.embed(texts)
+    return engine.stats
+
+
+def create_model(backend: str = "default", api_key: Optional[str] = None, dimensions: int = 768):
+    """Build the embedding model for one of EMBEDDING_BACKENDS (dimensions applies to "local" only)"""
+    if backend == "default":
+        from chromadb.utils import embedding_functions
+        return ChromaEmbeddingModel(embedding_functions.DefaultEmbeddingFunction())
+    if backend == "gemini":
+        return GeminiEmbeddingModel(model=GEMINI_EMBEDDING_MODEL, api_key=api_key)
+    if backend == "local":
+        return LocalEmbeddingModel(dimensions=dimensions)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+
+def _rss_bytes() -> int:
+    """Current resident memory of this process (0 where it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+@dataclass
+class WarmupReport:
+    """How long it took to load a model and run its first inference"""
+    backend: str
+    model_name: str
+    dimensions: int
+    load_seconds: float
+    warmup_seconds: float
+    # Growth of resident memory across load and warmup - approximately the model's footprint
+    memory_bytes: int
+
+
+def warm_up_model(backend: str = "default", api_key: Optional[str] = None, dimensions: int = 768,
+                  warmup_text: str = "warmup") -> Tuple[object, WarmupReport]:
+    """Create the model and run one inference so lazy loading (model download, ONNX session,
+    API client) happens now rather than on the first user's request"""
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    model = create_model(backend, api_key=api_key, dimensions=dimensions)
+    loaded = time.perf_counter()
+    # Called on the model directly: going through a cache could skip the inference entirely
+    vector = model.embed_batch([warmup_text])[0]
+    warmed = time.perf_counter()
+    report = WarmupReport(backend, model.name, len(vector), loaded - started, warmed - loaded,
+                          max(_rss_bytes() - rss_before, 0))
+    return model, report
@@ -0,0 +1,441 @@
+# In-process exact (flat) vector index with optional float16 / int8 storage, for small collections
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+SPACES = ("l2", "cosine", "ip")
+CONFIG_FILE = "config.json"
+RECORDS_FILE = "records.json"
+# Rows scored per matrix product, so float16/int8 blocks are widened to float32 a slice at a time
+SCORE_BLOCK_ROWS = 8192
+DEFAULT_RERANK_FACTOR = 4
+# Buffers grow to at least double their size, so appends copy each row a constant number of times
+MIN_CAPACITY = 1024
+# Records and config are rewritten after this many changed rows, or on the first write after
+# DEFAULT_PERSIST_INTERVAL idle seconds; vectors go straight into the memory-mapped files
+DEFAULT_PERSIST_EVERY = 10_000
+DEFAULT_PERSIST_INTERVAL = 5.0
+INCLUDE_DEFAULT = ["documents", "metadatas", "distances"]
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported where operator: {operator}")
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style where filter against one metadata dict"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_compare(value, operator, operand) for operator, operand in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def matches_document(document: Optional[str], where_document: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style where_document filter ($contains / $not_contains / $and / $or)"""
+    if not where_document:
+        return True
+    document = document or ""
+    for operator, operand in where_document.items():
+        if operator == "$contains":
+            if operand not in document:
+                return False
+        elif operator == "$not_contains":
+            if operand in document:
+                return False
+        elif operator == "$and":
+            if not all(matches_document(document, part) for part in operand):
+                return False
+        elif operator == "$or":
+            if not any(matches_document(document, part) for part in operand):
+                return False
+        else:
+            raise ValueError(f"Unsupported where_document operator: {operator}")
+    return True
+
+
+class FlatCollection:
+    """Brute-force vector search over one contiguous NumPy matrix, with the subset of the Chroma
+    collection API used by the demos (add, upsert, get, query, delete, count).
+
+    With dtype float16 or int8 the matrix in memory is compressed; the top n_results * rerank_factor
+    candidates are then re-scored against float32 vectors read from a memory-mapped file, so the
+    returned distances are exact.
+
+    With a path, the arrays are memory-mapped .npy files with spare capacity, so a write only touches
+    its own rows. Ids, documents and metadata are persisted in batches (see DEFAULT_PERSIST_EVERY),
+    on persist() / close() and at interpreter exit; a crash can lose the writes since the last one.
+    """
+
+    def __init__(self, name: str, path: Optional[str] = None, dtype: str = "float32", space: str = "l2",
+                 rerank_factor: int = DEFAULT_RERANK_FACTOR, metadata: Optional[Dict[str, Any]] = None,
+                 persist_every: int = DEFAULT_PERSIST_EVERY, persist_interval: float = DEFAULT_PERSIST_INTERVAL):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        if space not in SPACES:
+            raise ValueError(f"space must be one of {SPACES}")
+        self.name = name
+        self.path = path
+        self.dtype = dtype
+        self.space = space
+        self.rerank_factor = rerank_factor
+        self.metadata = metadata
+        # Same shape as a Chroma collection's configuration, so settings readers find nothing to show
+        self.configuration: Dict[str, Any] = {}
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._sq_norms: Optional[np.ndarray] = None
+        self._full: Optional[np.ndarray] = None
+        # Arrays with spare rows; the attributes above are views of their first count() rows
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._capacity = 0
+        self.persist_every = persist_every
+        self.persist_interval = persist_interval
+        self._unpersisted_rows = 0
+        self._persisted_at = time.monotonic()
+        self._lock = threading.RLock()
+        if path:
+            atexit.register(self.persist)
+
+    # ----- persistence -----
+
+    @classmethod
+    def open(cls, name: str, path: str, dtype: str = "float32", space: str = "l2",
+             rerank_factor: int = DEFAULT_RERANK_FACTOR, metadata: Optional[Dict[str, Any]] = None) -> "FlatCollection":
+        """Load a persisted collection (memory-mapped, no copy) or create an empty one at path"""
+        if not os.path.exists(os.path.join(path, CONFIG_FILE)):
+            collection = cls(name, path, dtype, space, rerank_factor, metadata)
+            collection.persist()
+            return collection
+        with open(os.path.join(path, CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        # Storage type and space are fixed at creation, like an HNSW collection's space
+        collection = cls(name, path, config["dtype"], config["space"], rerank_factor, config.get("metadata"))
+        with open(os.path.join(path, RECORDS_FILE), encoding="utf-8") as f:
+            records = json.load(f)
+        collection._ids = records["ids"]
+        collection._documents = records["documents"]
+        collection._metadatas = records["metadatas"]
+        collection._rows = {doc_id: row for row, doc_id in enumerate(collection._ids)}
+        for stem in collection._stems():
+            array_path = os.path.join(path, f"{stem}.npy")
+            if os.path.exists(array_path):
+                collection._buffers[stem] = np.load(array_path, mmap_mode="r+")
+        if collection._buffers:
+            collection._capacity = min(len(buffer) for buffer in collection._buffers.values())
+            if collection._capacity < len(collection._ids):
+                raise ValueError(f"Flat index at {path} has fewer vectors than records")
+        collection._refresh_views()
+        return collection
+
+    def persist(self):
+        """Flush the memory-mapped arrays and write the records and config"""
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            for buffer in self._buffers.values():
+                buffer.flush()
+            for name, content in ((RECORDS_FILE, {"ids": self._ids, "documents": self._documents,
+                                                  "metadatas": self._metadatas}),
+                                  (CONFIG_FILE, {"dtype": self.dtype, "space": self.space,
+                                                 "metadata": self.metadata})):
+                temp = os.path.join(self.path, name + ".tmp")
+                with open(temp, "w", encoding="utf-8") as f:
+                    json.dump(content, f)
+                os.replace(temp, os.path.join(self.path, name))
+            self._unpersisted_rows = 0
+            self._persisted_at = time.monotonic()
+
+    def close(self):
+        self.persist()
+
+    def _written(self, rows: int):
+        self._unpersisted_rows += rows
+        if (self._unpersisted_rows >= self.persist_every
+                or time.monotonic() - self._persisted_at >= self.persist_interval):
+            self.persist()
+
+    # ----- storage helpers -----
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype != "float32"
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes of the arrays scanned on every query (the float32 rerank copy is not counted)"""
+        arrays = (self._vectors, self._scales, self._sq_norms)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("embeddings must be a 2-D list or array")
+        if self._vectors is not None and len(self._ids) and vectors.shape[1] != self._vectors.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection "
+                             f"dimensionality {self._vectors.shape[1]}")
+        if self.space == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def _encode(self, vectors: np.ndarray):
+        """(stored vectors, per-row scales or None) for float32 input rows"""
+        if self.dtype == "int8":
+            # Symmetric per-row quantization: the largest component maps to +/-127
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.dtype), None
+
+    def _stems(self) -> List[str]:
+        stems = ["vectors", "sq_norms"]
+        if self.dtype == "int8":
+            stems.append("scales")
+        if self.quantized:
+            # Full-precision vectors are only read for reranking, so they stay on disk
+            stems.append("full")
+        return stems
+
+    def _refresh_views(self):
+        count = len(self._ids)
+        if not self._buffers:
+            self._vectors = self._sq_norms = self._scales = self._full = None
+            return
+        self._vectors = self._buffers["vectors"][:count]
+        self._sq_norms = self._buffers["sq_norms"][:count]
+        self._scales = self._buffers["scales"][:count] if "scales" in self._buffers else None
+        self._full = self._buffers["full"][:count] if "full" in self._buffers else self._vectors
+
+    def _reserve(self, rows: int, width: int):
+        """Make room for rows more rows, growing every buffer to at least twice its capacity"""
+        count = len(self._ids)
+        if self._buffers and self._buffers["vectors"].shape[1] != width:
+            if count:
+                raise ValueError(f"Embedding dimension {width} does not match collection "
+                                 f"dimensionality {self._buffers['vectors'].shape[1]}")
+            # Emptied collection: start over with the new dimensionality
+            self._buffers, self._capacity = {}, 0
+        if count + rows <= self._capacity:
+            return
+        capacity = max(count + rows, 2 * self._capacity, MIN_CAPACITY)
+        for stem in self._stems():
+            dtype = self.dtype if stem == "vectors" else "float32"
+            shape = (capacity, width) if stem in ("vectors", "full") else (capacity,)
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                final = os.path.join(self.path, f"{stem}.npy")
+                temp = final + ".tmp.npy"
+                buffer = np.lib.format.open_memmap(temp, mode="w+", dtype=dtype, shape=shape)
+            else:
+                buffer = np.empty(shape, dtype=dtype)
+            if count:
+                buffer[:count] = self._buffers[stem][:count]
+            if self.path:
+                buffer.flush()
+                os.replace(temp, final)
+            self._buffers[stem] = buffer
+        self._capacity = capacity
+
+    def _write_rows(self, rows, vectors: np.ndarray):
+        stored, scales = self._encode(vectors)
+        self._buffers["vectors"][rows] = stored
+        self._buffers["sq_norms"][rows] = np.einsum("ij,ij->i", vectors, vectors)
+        if scales is not None:
+            self._buffers["scales"][rows] = scales
+        if self.quantized:
+            self._buffers["full"][rows] = vectors
+
+    def _append(self, ids, documents, metadatas, vectors: np.ndarray):
+        self._reserve(len(ids), vectors.shape[1])
+        start = len(self._ids)
+        self._write_rows(slice(start, start + len(ids)), vectors)
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            self._rows[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+            self._documents.append(document)
+            self._metadatas.append(metadata)
+        self._refresh_views()
+
+    def _remove_rows(self, rows: List[int]):
+        if not rows:
+            return
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+        kept = np.flatnonzero(keep)
+        for buffer in self._buffers.values():
+            # Compacted in place; the fancy index copies the kept rows before they are written back
+            buffer[:len(kept)] = buffer[kept]
+        self._ids = [doc_id for doc_id, kept in zip(self._ids, keep) if kept]
+        self._documents = [doc for doc, kept in zip(self._documents, keep) if kept]
+        self._metadatas = [metadata for metadata, kept in zip(self._metadatas, keep) if kept]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._refresh_views()
+
+    @staticmethod
+    def _normalize_args(ids, documents, metadatas, embeddings):
+        if embeddings is None:
+            raise ValueError("FlatCollection stores precomputed embeddings only; pass embeddings=")
+        count = len(ids)
+        documents = list(documents) if documents is not None else [None] * count
+        metadatas = list(metadatas) if metadatas is not None else [None] * count
+        if not (len(documents) == len(metadatas) == len(embeddings) == count):
+            raise ValueError("ids, documents, metadatas and embeddings must have the same length")
+        return list(ids), documents, metadatas
+
+    # ----- Chroma-compatible surface -----
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids, embeddings=None, documents=None, metadatas=None):
+        ids, documents, metadatas = self._normalize_args(ids, documents, metadatas, embeddings)
+        with self._lock:
+            duplicates = [doc_id for doc_id in ids if doc_id in self._rows]
+            if duplicates or len(set(ids)) != len(ids):
+                raise ValueError(f"IDs already exist: {', '.join(duplicates[:5]) or 'duplicated in the request'}")
+            self._append(ids, documents, metadatas, self._prepare(embeddings))
+            self._written(len(ids))
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        ids, documents, metadatas = self._normalize_args(ids, documents, metadatas, embeddings)
+        vectors = self._prepare(embeddings)
+        with self._lock:
+            # Existing ids are overwritten in place, new ones appended; the last occurrence of a repeated id wins
+            latest = {doc_id: index for index, doc_id in enumerate(ids)}
+            replaced = [index for doc_id, index in latest.items() if doc_id in self._rows]
+            added = sorted(index for doc_id, index in latest.items() if doc_id not in self._rows)
+            if replaced:
+                rows = [self._rows[ids[i]] for i in replaced]
+                self._write_rows(rows, vectors[replaced])
+                for row, i in zip(rows, replaced):
+                    self._documents[row] = documents[i]
+                    self._metadatas[row] = metadatas[i]
+            if added:
+                self._append([ids[i] for i in added], [documents[i] for i in added],
+                             [metadatas[i] for i in added], vectors[added])
+            self._written(len(latest))
+
+    def delete(self, ids=None, where=None, where_document=None):
+        with self._lock:
+            rows = self._filter_rows(ids, where, where_document).tolist()
+            self._remove_rows(rows)
+            self._written(len(rows))
+
+    def _filter_rows(self, ids=None, where=None, where_document=None) -> np.ndarray:
+        if ids is not None:
+            rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+        else:
+            rows = range(len(self._ids))
+        if where or where_document:
+            rows = [row for row in rows
+                    if matches_where(self._metadatas[row], where)
+                    and matches_document(self._documents[row], where_document)]
+        return np.asarray(list(rows), dtype=np.int64)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, where_document=None, include=None):
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._lock:
+            rows = self._filter_rows(ids, where, where_document)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._documents[row] for row in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[row] for row in rows] if "metadatas" in include else None,
+                "embeddings": (np.asarray(self._full[rows], dtype=np.float32)
+                               if "embeddings" in include and len(rows) else None),
+            }
+
+    def _approximate_scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Similarity (higher is closer) of each query to each candidate row, from the stored matrix"""
+        vectors = self._vectors if rows is None else self._vectors[rows]
+        sq_norms = self._sq_norms if rows is None else self._sq_norms[rows]
+        scales = None
+        if self._scales is not None:
+            scales = self._scales if rows is None else self._scales[rows]
+        scores = np.empty((queries.shape[0], vectors.shape[0]), dtype=np.float32)
+        for start in range(0, vectors.shape[0], SCORE_BLOCK_ROWS):
+            block = slice(start, start + SCORE_BLOCK_ROWS)
+            dots = queries @ np.asarray(vectors[block], dtype=np.float32).T
+            if scales is not None:
+                dots *= scales[block]
+            # For l2, ||q||^2 is the same for every row, so 2q.x - ||x||^2 orders rows by distance
+            scores[:, block] = 2 * dots - sq_norms[block] if self.space == "l2" else dots
+        return scores
+
+    def _distances(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Exact distances (Chroma's definitions) from float32 vectors"""
+        vectors = np.asarray(self._full[rows], dtype=np.float32)
+        if self.space == "l2":
+            difference = vectors - query
+            return np.einsum("ij,ij->i", difference, difference)
+        return 1.0 - vectors @ query
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, where_document=None, include=None):
+        include = include if include is not None else INCLUDE_DEFAULT
+        queries = self._prepare(query_embeddings) if len(self._ids) else np.asarray(query_embeddings, np.float32)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            rows = self._filter_rows(where=where, where_document=where_document) if (where or where_document) else None
+            candidates_total = len(self._ids) if rows is None else len(rows)
+            if candidates_total:
+                scores = self._approximate_scores(queries, rows)
+            for index, query in enumerate(queries):
+                if not candidates_total:
+                    top = np.empty(0, dtype=np.int64)
+                else:
+                    # Over-fetch when the scores are approximate, then rank the candidates exactly
+                    fetch = min(n_results * (self.rerank_factor if self.quantized else 1), candidates_total)
+                    candidates = np.argpartition(-scores[index], fetch - 1)[:fetch]
+                    candidate_rows = candidates if rows is None else rows[candidates]
+                    distances = self._distances(query, candidate_rows)
+                    order = np.argsort(distances)[:n_results]
+                    top, top_distances = candidate_rows[order], distances[order]
+                results["ids"].append([self._ids[row] for row in top])
+                results["documents"].append([self._documents[row] for row in top])
+                results["metadatas"].append([self._metadatas[row] for row in top])
+                results["distances"].append([float(d) for d in top_distances] if len(top) else [])
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                results[key] = None
+        return results
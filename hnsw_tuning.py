@@ -0,0 +1,209 @@
+# HNSW index configuration and recall/latency tuning harness for Chroma collections
+# Examples:
+#   python hnsw_tuning.py --synthetic 20000 --dim 384 --m 8,16,32 --ef-search 10,50,100
+#   python hnsw_tuning.py --collection krish_collection --sample 5000 --output tuning.json
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SPACES = ("cosine", "l2", "ip")
+# Chroma's defaults for new collections
+DEFAULT_SPACE = "l2"
+DEFAULT_MAX_NEIGHBORS = 16
+DEFAULT_EF_CONSTRUCTION = 100
+DEFAULT_EF_SEARCH = 100
+
+
+@dataclass(frozen=True)
+class HnswParams:
+    """HNSW settings: distance space, M (max_neighbors), ef_construction and ef_search"""
+    space: str = DEFAULT_SPACE
+    max_neighbors: int = DEFAULT_MAX_NEIGHBORS
+    ef_construction: int = DEFAULT_EF_CONSTRUCTION
+    ef_search: int = DEFAULT_EF_SEARCH
+
+    def to_configuration(self) -> Dict:
+        if self.space not in SPACES:
+            raise ValueError(f"space must be one of {SPACES}")
+        return {"hnsw": {
+            "space": self.space,
+            "max_neighbors": self.max_neighbors,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+        }}
+
+    @classmethod
+    def from_collection(cls, collection) -> "HnswParams":
+        """Read the settings a collection was created with"""
+        hnsw = (collection.configuration or {}).get("hnsw") or {}
+        return cls(
+            space=hnsw.get("space", DEFAULT_SPACE),
+            max_neighbors=hnsw.get("max_neighbors", DEFAULT_MAX_NEIGHBORS),
+            ef_construction=hnsw.get("ef_construction", DEFAULT_EF_CONSTRUCTION),
+            ef_search=hnsw.get("ef_search", DEFAULT_EF_SEARCH),
+        )
+
+
+def get_or_create_collection(client, name: str, params: HnswParams, metadata: Optional[Dict] = None):
+    """Like client.get_or_create_collection, applying the HNSW settings when the collection is new"""
+    return client.get_or_create_collection(name=name, metadata=metadata, configuration=params.to_configuration())
+
+
+def set_ef_search(collection, ef_search: int):
+    """ef_search is the only HNSW setting that can change after creation.
+
+    The new value is persisted, but an index already loaded by this process keeps the old one
+    until the client is reopened.
+    """
+    collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Brute-force top-k row indices per query, using the same distance as the index"""
+    if space == "l2":
+        distances = (np.sum(queries ** 2, axis=1, keepdims=True) - 2 * queries @ corpus.T
+                     + np.sum(corpus ** 2, axis=1))
+    elif space == "cosine":
+        corpus_unit = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        queries_unit = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        distances = 1.0 - queries_unit @ corpus_unit.T
+    else:
+        distances = 1.0 - queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+@dataclass
+class TuningResult:
+    space: str
+    max_neighbors: int
+    ef_construction: int
+    ef_search: int
+    build_seconds: float
+    recall_at_k: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def tune(corpus: np.ndarray, queries: np.ndarray, k: int = 10, spaces=(DEFAULT_SPACE,),
+         max_neighbors_values=(DEFAULT_MAX_NEIGHBORS,), ef_construction_values=(DEFAULT_EF_CONSTRUCTION,),
+         ef_search_values=(DEFAULT_EF_SEARCH,), batch_size: int = 1000, log=print) -> List[TuningResult]:
+    """Build one in-memory index per parameter set and measure recall@k and query latency on it"""
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    ids = [str(i) for i in range(corpus.shape[0])]
+    truths = {}
+    results = []
+    # A loaded index ignores later ef_search changes, so every combination gets a fresh index
+    for space, max_neighbors, ef_construction, ef_search in itertools.product(
+            spaces, max_neighbors_values, ef_construction_values, ef_search_values):
+        if space not in truths:
+            truths[space] = exact_neighbors(corpus, queries, k, space)
+        truth = truths[space]
+        name = f"tune-{uuid.uuid4().hex[:12]}"
+        params = HnswParams(space, max_neighbors, ef_construction, ef_search)
+        collection = client.create_collection(name=name, configuration=params.to_configuration())
+        started = time.perf_counter()
+        for start in range(0, len(ids), batch_size):
+            collection.add(ids=ids[start:start + batch_size], embeddings=corpus[start:start + batch_size])
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            query_started = time.perf_counter()
+            found = collection.query(query_embeddings=[query], n_results=k, include=[])
+            latencies.append((time.perf_counter() - query_started) * 1000)
+            hits += len({int(i) for i in found["ids"][0]} & set(expected.tolist()))
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result = TuningResult(space, max_neighbors, ef_construction, ef_search, round(build_seconds, 3),
+                              hits / (len(queries) * truth.shape[1]), float(p50), float(p95), float(p99))
+        results.append(result)
+        if log:
+            log(format_result(result, k))
+        client.delete_collection(name)
+    return results
+
+
+def format_result(result: TuningResult, k: int) -> str:
+    return (f"space={result.space:<6} M={result.max_neighbors:<3} ef_construction={result.ef_construction:<4} "
+            f"ef_search={result.ef_search:<4} recall@{k}={result.recall_at_k:.3f}  "
+            f"p50={result.p50_ms:.2f}ms p95={result.p95_ms:.2f}ms p99={result.p99_ms:.2f}ms")
+
+
+def load_collection_sample(db_path: str, collection_name: str, sample: int, n_queries: int, seed: int = 0):
+    """Sample stored embeddings; held-out rows become queries so they are not trivially found"""
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=db_path).get_collection(collection_name)
+    data = collection.get(limit=sample + n_queries, include=["embeddings"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    if len(vectors) <= n_queries:
+        raise ValueError(f"Collection '{collection_name}' has too few vectors ({len(vectors)}) to tune on")
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[n_queries:]], vectors[order[:n_queries]]
+
+
+def synthetic_sample(n: int, dim: int, n_queries: int, seed: int = 0):
+    """Clustered random vectors, which behave more like real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 500, 1), dim)).astype(np.float32)
+    assignments = rng.integers(0, len(centers), size=n + n_queries)
+    vectors = centers[assignments] + 0.3 * rng.normal(size=(n + n_queries, dim)).astype(np.float32)
+    return vectors[n_queries:], vectors[:n_queries]
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare HNSW settings by recall@k against exact search and latency percentiles")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--collection", help="Sample embeddings from this collection in --db-path")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Use N synthetic vectors instead")
+    parser.add_argument("--db-path", default=os.path.join(os.getcwd(), "krish_demo_db"))
+    parser.add_argument("--dim", type=int, default=384, help="Dimensions for --synthetic (default: 384)")
+    parser.add_argument("--sample", type=int, default=5000, help="Vectors to sample from --collection")
+    parser.add_argument("--queries", type=int, default=100, help="Held-out query vectors")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--space", default=DEFAULT_SPACE, help=f"Comma-separated spaces from {SPACES}")
+    parser.add_argument("--m", default=str(DEFAULT_MAX_NEIGHBORS), help="Comma-separated M (max_neighbors) values")
+    parser.add_argument("--ef-construction", default=str(DEFAULT_EF_CONSTRUCTION))
+    parser.add_argument("--ef-search", default="10,50,100,200")
+    parser.add_argument("--output", help="Write results as JSON here")
+    args = parser.parse_args(argv)
+
+    if args.collection:
+        corpus, queries = load_collection_sample(args.db_path, args.collection, args.sample, args.queries)
+    else:
+        corpus, queries = synthetic_sample(args.synthetic, args.dim, args.queries)
+    print(f"📐 {corpus.shape[0]} vectors x {corpus.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    results = tune(corpus, queries, k=args.k,
+                   spaces=[space.strip() for space in args.space.split(",")],
+                   max_neighbors_values=_int_list(args.m),
+                   ef_construction_values=_int_list(args.ef_construction),
+                   ef_search_values=_int_list(args.ef_search))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "vectors": int(corpus.shape[0]), "queries": int(len(queries)),
+                       "results": [asdict(result) for result in results]}, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
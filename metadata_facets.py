@@ -0,0 +1,150 @@
+# Per-collection facet index (distinct metadata values and counts) and Chroma filter builders
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_VALUES = 200
+SCAN_PAGE_SIZE = 1000
+
+
+def _is_number(value: Any) -> bool:
+    # bool is an int subclass, but True/False filters are equality filters, not ranges
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@dataclass
+class FieldFacet:
+    """Distinct values and document counts of one metadata field"""
+    counts: Counter = field(default_factory=Counter)
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    # Set once the field has more distinct values than the index keeps, e.g. per-document titles
+    overflow: bool = False
+
+    @property
+    def numeric(self) -> bool:
+        return self.minimum is not None
+
+    def top_values(self, limit: Optional[int] = None) -> List:
+        return [value for value, _ in self.counts.most_common(limit)]
+
+
+class FacetIndex:
+    """Facet counts per collection, built with one metadata-only scan and then kept up to date.
+
+    add() and remove() adjust the counts for adds and deletes, and upsert() for bulk writes that
+    may overwrite existing documents; only invalidate() makes the next facets() call rescan.
+    """
+
+    def __init__(self, max_values: int = DEFAULT_MAX_VALUES):
+        self.max_values = max_values
+        # name -> (collection class it was scanned from, facets)
+        self._facets: Dict[str, Tuple[type, Dict[str, FieldFacet]]] = {}
+        self._lock = threading.Lock()
+
+    def _tracked(self, collection) -> Optional[Dict[str, FieldFacet]]:
+        # Facets scanned from the other backend's collection of the same name do not count
+        source, facets = self._facets.get(collection.name, (None, None))
+        return facets if source is type(collection) else None
+
+    def facets(self, collection) -> Dict[str, FieldFacet]:
+        with self._lock:
+            facets = self._tracked(collection)
+        if facets is None:
+            facets = self._scan(collection)
+            with self._lock:
+                self._facets[collection.name] = (type(collection), facets)
+        return facets
+
+    def _scan(self, collection) -> Dict[str, FieldFacet]:
+        facets: Dict[str, FieldFacet] = {}
+        offset = 0
+        while True:
+            # Metadata only - documents and embeddings are never loaded
+            page = collection.get(include=["metadatas"], limit=SCAN_PAGE_SIZE, offset=offset)
+            self._count(facets, page["metadatas"] or [], 1)
+            if len(page["ids"]) < SCAN_PAGE_SIZE:
+                return facets
+            offset += SCAN_PAGE_SIZE
+
+    def _count(self, facets: Dict[str, FieldFacet], metadatas: Iterable[Optional[Dict]], delta: int):
+        for metadata in metadatas:
+            for key, value in (metadata or {}).items():
+                if value is None or isinstance(value, list):
+                    continue
+                facet = facets.setdefault(key, FieldFacet())
+                if _is_number(value) and delta > 0:
+                    facet.minimum = value if facet.minimum is None else min(facet.minimum, value)
+                    facet.maximum = value if facet.maximum is None else max(facet.maximum, value)
+                if facet.overflow:
+                    continue
+                facet.counts[value] += delta
+                if facet.counts[value] <= 0:
+                    del facet.counts[value]
+                if len(facet.counts) > self.max_values:
+                    facet.overflow = True
+                    facet.counts.clear()
+
+    def add(self, collection, metadatas: Iterable[Optional[Dict]]):
+        """Count newly added documents (ignored until the collection has been scanned)"""
+        with self._lock:
+            facets = self._tracked(collection)
+            if facets is not None:
+                self._count(facets, metadatas, 1)
+
+    def remove(self, collection, metadatas: Iterable[Optional[Dict]]):
+        """Uncount deleted documents; numeric ranges only ever widen until the next rescan"""
+        with self._lock:
+            facets = self._tracked(collection)
+            if facets is not None:
+                self._count(facets, metadatas, -1)
+
+    def upsert(self, collection, ids: List[str], metadatas: Iterable[Optional[Dict]]):
+        """Count an upsert's metadata in place of the stored versions it overwrites.
+
+        Call it before writing: the overwritten metadata is looked up by id, which reads no
+        documents or embeddings. Ignored until the collection has been scanned.
+        """
+        with self._lock:
+            if self._tracked(collection) is None:
+                return
+        previous = collection.get(ids=list(ids), include=["metadatas"])["metadatas"] or []
+        with self._lock:
+            facets = self._tracked(collection)
+            if facets is not None:
+                self._count(facets, previous, -1)
+                self._count(facets, metadatas, 1)
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            self._facets.pop(collection_name, None)
+
+
+def value_condition(key: str, values: List) -> Optional[Dict[str, Any]]:
+    """Equality for one selected value, $in for several"""
+    if not values:
+        return None
+    return {key: values[0]} if len(values) == 1 else {key: {"$in": list(values)}}
+
+
+def range_condition(key: str, low: Optional[float] = None, high: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    conditions = []
+    if low is not None:
+        conditions.append({key: {"$gte": low}})
+    if high is not None:
+        conditions.append({key: {"$lte": high}})
+    return combine_conditions(conditions)
+
+
+def combine_conditions(conditions: Iterable[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """AND together the non-empty conditions; None when there are none, as collection.query expects"""
+    conditions = [condition for condition in conditions if condition]
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def contains_condition(text: str) -> Optional[Dict[str, Any]]:
+    """where_document filter for a substring of the document text"""
+    return {"$contains": text} if text else None
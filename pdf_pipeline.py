@@ -0,0 +1,112 @@
+# Streaming PDF -> text -> token-bounded chunks -> batched embed -> upsert pipeline
+import os
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from bulk_ingest import IngestCheckpoint, IngestResult, ingest_rows
+
+# Same WordPiece tokenizer as Chroma's default all-MiniLM-L6-v2 model, so chunk sizes match its input limit
+DEFAULT_TOKENIZER = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 32
+
+_tokenizer_cache = {}
+
+
+def load_tokenizer(name: str = DEFAULT_TOKENIZER):
+    """Load a Hugging Face tokenizer, falling back to a whitespace tokenizer when offline"""
+    if name not in _tokenizer_cache:
+        from tokenizers import Tokenizer
+        try:
+            tokenizer = Tokenizer.from_pretrained(name)
+        except Exception:
+            # Only token offsets are used for chunking, so an empty vocabulary is fine here
+            from tokenizers.models import WordLevel
+            from tokenizers.pre_tokenizers import Whitespace
+            tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+            tokenizer.pre_tokenizer = Whitespace()
+        _tokenizer_cache[name] = tokenizer
+    return _tokenizer_cache[name]
+
+
+def iter_pdf_pages(source, start_page: int = 1, end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (1-based page number, text) one page at a time"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(source)
+    last_page = min(end_page or len(reader.pages), len(reader.pages))
+    for page_number in range(start_page, last_page + 1):
+        yield page_number, reader.pages[page_number - 1].extract_text() or ""
+
+
+def iter_chunks(pages, max_tokens: int = DEFAULT_MAX_TOKENS, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                tokenizer=None, source: str = "document") -> Iterator[Dict[str, Any]]:
+    """Split a stream of (page number, text) into overlapping chunks of at most max_tokens tokens"""
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    tokenizer = tokenizer or load_tokenizer()
+    # Each buffered token is (page number, start offset, end offset) into that page's text
+    buffer = deque()
+    page_texts: Dict[int, str] = {}
+    chunk_index = 0
+    new_tokens = 0
+
+    def make_chunk(tokens):
+        pieces = []
+        span_page, span_start, span_end = tokens[0]
+        for page_number, start, end in tokens[1:]:
+            if page_number != span_page:
+                pieces.append(page_texts[span_page][span_start:span_end])
+                span_page, span_start = page_number, start
+            span_end = end
+        pieces.append(page_texts[span_page][span_start:span_end])
+        return {
+            "id": f"{source}#chunk{chunk_index}",
+            "text": "\n".join(pieces),
+            "metadata": {
+                "source": source,
+                "page_start": tokens[0][0],
+                "page_end": tokens[-1][0],
+                "chunk_index": chunk_index,
+                "token_count": len(tokens),
+            },
+        }
+
+    for page_number, text in pages:
+        if not text.strip():
+            continue
+        page_texts[page_number] = text
+        encoding = tokenizer.encode(text, add_special_tokens=False)
+        for start, end in encoding.offsets:
+            buffer.append((page_number, start, end))
+            new_tokens += 1
+            if len(buffer) >= max_tokens:
+                yield make_chunk(list(buffer))
+                chunk_index += 1
+                # Keep the tail of this chunk as the head of the next one
+                for _ in range(max_tokens - overlap_tokens):
+                    buffer.popleft()
+                new_tokens = 0
+        # Forget pages that no buffered token points at so memory stays bounded by one chunk
+        live_pages = {token[0] for token in buffer}
+        for stale_page in [p for p in page_texts if p not in live_pages and p != page_number]:
+            del page_texts[stale_page]
+
+    if buffer and (new_tokens or chunk_index == 0):
+        yield make_chunk(list(buffer))
+
+
+def ingest_pdf(collection, source, name: str, embedder=None, max_tokens: int = DEFAULT_MAX_TOKENS,
+               overlap_tokens: int = DEFAULT_OVERLAP_TOKENS, batch_size: int = 64,
+               checkpoint: Optional[IngestCheckpoint] = None, checkpoint_key: Optional[str] = None,
+               progress_callback: Optional[Callable[[IngestResult], None]] = None,
+               deduplicator=None, skip_duplicates: bool = True, facet_index=None) -> IngestResult:
+    """Stream a PDF into a collection; only one batch of chunks and embeddings is held at a time.
+
+    A deduplicator drops repeated chunks such as identical headers, footers and boilerplate pages.
+    """
+    chunks = iter_chunks(iter_pdf_pages(source), max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                         source=os.path.basename(name))
+    return ingest_rows(collection, chunks, embedder=embedder, chunk_size=batch_size,
+                       checkpoint=checkpoint, checkpoint_key=checkpoint_key,
+                       progress_callback=progress_callback, deduplicator=deduplicator,
+                       skip_duplicates=skip_duplicates, facet_index=facet_index)
@@ -0,0 +1,87 @@
+# Version-aware cache of vector store query results
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class QueryCache:
+    """LRU cache of query results keyed by (collection, version, query, n_results, filters).
+
+    Every write to a collection must call bump(); the new version number makes all older
+    entries for that collection unreachable, and they are dropped right away.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.stats = QueryCacheStats()
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, collection_name: str) -> int:
+        with self._lock:
+            return self._versions.get(collection_name, 0)
+
+    def bump(self, collection_name: str):
+        """Record a write to a collection, invalidating its cached results"""
+        with self._lock:
+            self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+            for key in [key for key in self._entries if key[0] == collection_name]:
+                del self._entries[key]
+
+    def _key(self, collection_name, query_text, n_results, where, where_document) -> Tuple:
+        return (
+            collection_name,
+            self._versions.get(collection_name, 0),
+            query_text,
+            n_results,
+            # Filters are dicts, so a canonical JSON string makes them hashable
+            json.dumps(where, sort_keys=True) if where else None,
+            json.dumps(where_document, sort_keys=True) if where_document else None,
+        )
+
+    def query(self, collection, query_text: str, n_results: int, embedder,
+              where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool, float]:
+        """Return (results, cache hit?, latency ms), running collection.query only on a miss"""
+        started = time.perf_counter()
+        with self._lock:
+            key = self._key(collection.name, query_text, n_results, where, where_document)
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+        if results is None:
+            results = collection.query(
+                query_embeddings=embedder.embed([query_text], task_type="retrieval_query"),
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+            )
+            with self._lock:
+                self.stats.misses += 1
+                # Only store if no write happened while the query was running
+                if key[1] == self._versions.get(collection.name, 0):
+                    self._entries[key] = results
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return results, False, (time.perf_counter() - started) * 1000
+        return results, True, (time.perf_counter() - started) * 1000
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
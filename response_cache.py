@@ -0,0 +1,167 @@
+# Exact-match + embedding-similarity cache for chat agent replies
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+SEMANTIC_TASK_TYPE = "semantic_similarity"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt used for exact matching"""
+    return re.sub(r"\s+", " ", prompt.strip().lower()).rstrip("?!. ")
+
+
+@dataclass
+class CacheEntry:
+    prompt: str
+    response: str
+    created_at: float
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass
+class CacheHit:
+    """A cached reply and how it was matched"""
+    response: str
+    match: str  # "exact" or "semantic"
+    similarity: float
+    cached_prompt: str
+
+
+@dataclass
+class ResponseCacheStats:
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / total if total else 0.0
+
+
+class ResponseCache:
+    """In-process reply cache with TTL, LRU max entries and optional embedding-similarity lookup.
+
+    The TTL and max entries are fixed at construction because one cache may serve many users;
+    each lookup can still use its own similarity threshold and a shorter max_age_seconds.
+    """
+
+    def __init__(self, embedder=None, similarity_threshold=0.92, ttl_seconds=3600, max_entries=1000):
+        # embedder is anything with embed_one(text, task_type=...), e.g. a CachedEmbedder
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = ResponseCacheStats()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked unit vectors of all entries, rebuilt lazily after inserts/evictions
+        self._matrix = None
+        self._matrix_keys = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embedder is None:
+            return None
+        try:
+            vector = np.asarray(self.embedder.embed_one(text, task_type=SEMANTIC_TASK_TYPE), dtype=np.float32)
+        except Exception:
+            # Similarity lookup is best-effort; exact matching still works without embeddings
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - entry.created_at > self.ttl_seconds
+
+    def _purge_expired_locked(self, now: float):
+        expired = [key for key, entry in self._entries.items() if self._expired(entry, now)]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _evict_locked(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _similarity_matrix_locked(self):
+        if self._matrix is None:
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            vectors = [self._entries[key].vector for key in self._matrix_keys]
+            self._matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        return self._matrix, self._matrix_keys
+
+    def lookup(self, prompt: str, similarity_threshold=None, max_age_seconds=None) -> Optional[CacheHit]:
+        """Return a cached reply for this prompt (or a close enough one), or None.
+
+        Entries older than max_age_seconds are ignored by this lookup but stay cached for others.
+        """
+        key = normalize_prompt(prompt)
+        threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        now = time.time()
+        oldest = now - max_age_seconds if max_age_seconds else None
+        with self._lock:
+            self._purge_expired_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None and (oldest is None or entry.created_at >= oldest):
+                self._entries.move_to_end(key)
+                self.stats.exact_hits += 1
+                return CacheHit(entry.response, "exact", 1.0, entry.prompt)
+            has_vectors = self.embedder is not None and len(self._entries) > 0
+
+        if has_vectors:
+            # Embed outside the lock; this may be a network call
+            vector = self._embed(prompt)
+            if vector is not None:
+                with self._lock:
+                    matrix, keys = self._similarity_matrix_locked()
+                    if len(keys) and matrix.shape[1] == vector.shape[0]:
+                        scores = matrix @ vector
+                        if oldest is not None:
+                            created = np.array([self._entries[k].created_at for k in keys])
+                            scores = np.where(created < oldest, -np.inf, scores)
+                        best = int(np.argmax(scores))
+                        best_key = keys[best]
+                        if scores[best] >= threshold and best_key in self._entries:
+                            entry = self._entries[best_key]
+                            self._entries.move_to_end(best_key)
+                            self.stats.semantic_hits += 1
+                            return CacheHit(entry.response, "semantic", float(scores[best]), entry.prompt)
+
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def store(self, prompt: str, response: str):
+        key = normalize_prompt(prompt)
+        vector = self._embed(prompt)
+        with self._lock:
+            self._entries[key] = CacheEntry(prompt, response, time.time(), vector)
+            self._entries.move_to_end(key)
+            self._matrix = None
+            self._evict_locked()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+
+def cached_run_sync(agent, cache: ResponseCache, prompt: str, **run_kwargs):
+    """agent.run_sync with the response cache in front; returns (output, CacheHit or None)"""
+    hit = cache.lookup(prompt)
+    if hit is not None:
+        return hit.response, hit
+    result = agent.run_sync(prompt, **run_kwargs)
+    cache.store(prompt, result.output)
+    return result.output, None
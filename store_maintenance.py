@@ -0,0 +1,198 @@
+# Size accounting, HNSW index rebuild and SQLite VACUUM for a Chroma PersistentClient directory
+import os
+import shutil
+import sqlite3
+import struct
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from hnsw_tuning import HnswParams
+
+SQLITE_FILE = "chroma.sqlite3"
+HNSW_SEGMENT_TYPE = "urn:chroma:segment/vector/hnsw-local-persisted"
+REBUILD_SUFFIX = "__rebuild"
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def read_hnsw_header(segment_dir: str) -> Optional[Tuple[int, int]]:
+    """(element count, allocated capacity) from an hnswlib header.bin, or None if unreadable.
+
+    Deleted vectors are only marked as deleted, so the element count keeps growing until the
+    index is rebuilt.
+    """
+    try:
+        with open(os.path.join(segment_dir, "header.bin"), "rb") as f:
+            header = f.read()
+    except OSError:
+        return None
+    # Chroma's hnswlib fork prefixes the classic 96-byte header with a 4-byte format version
+    offset = 4 if len(header) == 100 else 0
+    if len(header) < offset + 24:
+        return None
+    _, max_elements, element_count = struct.unpack_from("<QQQ", header, offset)
+    return element_count, max_elements
+
+
+@dataclass
+class CollectionUsage:
+    name: str
+    documents: int
+    index_elements: Optional[int]
+    index_capacity: Optional[int]
+    index_bytes: int
+    # Document text and metadata held in chroma.sqlite3 (approximate)
+    text_bytes: Optional[int]
+
+    @property
+    def deleted_elements(self) -> int:
+        return max((self.index_elements or 0) - self.documents, 0)
+
+
+@dataclass
+class SqliteUsage:
+    file_bytes: int
+    page_size: int
+    page_count: int
+    free_pages: int
+
+    @property
+    def free_bytes(self) -> int:
+        return self.free_pages * self.page_size
+
+
+@dataclass
+class MaintenanceResult:
+    action: str
+    before_bytes: int
+    after_bytes: int
+    seconds: float
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.before_bytes - self.after_bytes
+
+
+def _connect_readonly(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{os.path.join(db_path, SQLITE_FILE)}?mode=ro", uri=True)
+
+
+def sqlite_usage(db_path: str) -> SqliteUsage:
+    connection = _connect_readonly(db_path)
+    try:
+        page_size, page_count, free_pages = (
+            connection.execute(f"PRAGMA {pragma}").fetchone()[0]
+            for pragma in ("page_size", "page_count", "freelist_count")
+        )
+    finally:
+        connection.close()
+    return SqliteUsage(os.path.getsize(os.path.join(db_path, SQLITE_FILE)), page_size, page_count, free_pages)
+
+
+def collection_usage(client, db_path: str) -> List[CollectionUsage]:
+    """Per-collection document count, HNSW element count and on-disk size"""
+    connection = _connect_readonly(db_path)
+    usages = []
+    try:
+        for collection in client.list_collections():
+            # Chroma's internal schema; tolerated to be missing in other versions
+            try:
+                segment_ids = [row[0] for row in connection.execute(
+                    "SELECT id FROM segments WHERE collection = ? AND type = ?", (str(collection.id), HNSW_SEGMENT_TYPE))]
+                text_bytes = connection.execute(
+                    "SELECT SUM(LENGTH(m.string_value)) FROM embeddings e "
+                    "JOIN segments s ON e.segment_id = s.id JOIN embedding_metadata m ON m.id = e.id "
+                    "WHERE s.collection = ?", (str(collection.id),)).fetchone()[0] or 0
+            except sqlite3.Error:
+                segment_ids, text_bytes = [], None
+
+            index_elements = index_capacity = None
+            index_bytes = 0
+            for segment_id in segment_ids:
+                segment_dir = os.path.join(db_path, segment_id)
+                index_bytes += directory_size(segment_dir)
+                header = read_hnsw_header(segment_dir)
+                if header:
+                    index_elements = (index_elements or 0) + header[0]
+                    index_capacity = (index_capacity or 0) + header[1]
+            usages.append(CollectionUsage(collection.name, collection.count(), index_elements, index_capacity,
+                                          index_bytes, text_bytes))
+    finally:
+        connection.close()
+    return usages
+
+
+def orphaned_segment_dirs(db_path: str) -> List[str]:
+    """Segment folders no longer referenced by any collection, e.g. left behind by deletes"""
+    connection = _connect_readonly(db_path)
+    try:
+        live = {row[0] for row in connection.execute("SELECT id FROM segments")}
+    finally:
+        connection.close()
+    return [os.path.join(db_path, entry) for entry in os.listdir(db_path)
+            if os.path.isdir(os.path.join(db_path, entry)) and entry not in live]
+
+
+def remove_orphaned_segments(db_path: str) -> MaintenanceResult:
+    before = directory_size(db_path)
+    started = time.perf_counter()
+    for path in orphaned_segment_dirs(db_path):
+        shutil.rmtree(path, ignore_errors=True)
+    return MaintenanceResult("remove orphaned segments", before, directory_size(db_path),
+                             time.perf_counter() - started)
+
+
+def vacuum(db_path: str) -> MaintenanceResult:
+    """Rewrite chroma.sqlite3 without its free pages"""
+    sqlite_path = os.path.join(db_path, SQLITE_FILE)
+    before = os.path.getsize(sqlite_path)
+    started = time.perf_counter()
+    # isolation_level=None: VACUUM cannot run inside the transaction sqlite3 would otherwise open
+    connection = sqlite3.connect(sqlite_path, isolation_level=None, timeout=30)
+    try:
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return MaintenanceResult("vacuum", before, os.path.getsize(sqlite_path), time.perf_counter() - started)
+
+
+def rebuild_collection(client, name: str, db_path: str, batch_size: int = 1000, progress_callback=None):
+    """Copy a collection into a fresh index without deleted elements; returns (collection, result).
+
+    The copy is complete before the original is deleted, so a failure part-way leaves the
+    original untouched. Collection ids change, so callers must use the returned collection.
+    """
+    before = directory_size(db_path)
+    started = time.perf_counter()
+    source = client.get_collection(name)
+    temp_name = f"{name}{REBUILD_SUFFIX}"
+    try:
+        # Left over from an interrupted rebuild
+        client.delete_collection(temp_name)
+    except Exception:
+        pass
+    target = client.create_collection(temp_name, metadata=source.metadata,
+                                      configuration=HnswParams.from_collection(source).to_configuration())
+    copied = 0
+    while True:
+        page = source.get(limit=batch_size, offset=copied, include=["documents", "metadatas", "embeddings"])
+        if not page["ids"]:
+            break
+        target.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                   metadatas=page["metadatas"] if any(page["metadatas"] or []) else None)
+        copied += len(page["ids"])
+        if progress_callback:
+            progress_callback(copied)
+    client.delete_collection(name)
+    target.modify(name=name)
+    collection = client.get_collection(name)
+    # Chroma leaves the deleted collection's index folder on disk
+    remove_orphaned_segments(db_path)
+    return collection, MaintenanceResult("rebuild", before, directory_size(db_path), time.perf_counter() - started)
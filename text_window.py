@@ -0,0 +1,166 @@
+# Windowed access to large UTF-8 text: sparse line-offset index, ranged line reads and chunked search
+import codecs
+import io
+import re
+from array import array
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+# One offset is kept per this many lines, so the index is ~8 bytes per 1000 lines
+DEFAULT_STRIDE = 1000
+# A window never decodes more than this, even when a single line is longer
+DEFAULT_MAX_WINDOW_BYTES = 2 * 1024 * 1024
+PREVIEW_CHARS = 60
+
+
+def _as_stream(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+
+def _decoder():
+    # Incremental: a multi-byte character split across two reads is held back until it is complete
+    return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+@dataclass
+class LineIndex:
+    stride: int
+    offsets: array  # byte offset where lines 1, 1 + stride, 1 + 2 * stride, ... start
+    lines: int
+    size: int
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets)
+
+    def locate(self, line: int) -> Tuple[int, int]:
+        """(byte offset, line number starting there) of the nearest indexed line at or before line"""
+        checkpoint = min(max(line - 1, 0) // self.stride, len(self.offsets) - 1)
+        return self.offsets[checkpoint], checkpoint * self.stride + 1
+
+
+def build_line_index(source, stride: int = DEFAULT_STRIDE, chunk_size: int = DEFAULT_CHUNK_BYTES) -> LineIndex:
+    """Index line starts in one streaming pass over the raw bytes (nothing is decoded)"""
+    stream = _as_stream(source)
+    stream.seek(0)
+    offsets = array("Q", [0])
+    newlines = 0
+    size = 0
+    last_byte = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        positions = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 0x0A)
+        # Newline number n (1-based) ends line n, so line n * stride + 1 starts right after it
+        next_checkpoint = len(offsets) * stride
+        while next_checkpoint <= newlines + len(positions):
+            offsets.append(size + int(positions[next_checkpoint - newlines - 1]) + 1)
+            next_checkpoint += stride
+        newlines += len(positions)
+        size += len(chunk)
+        last_byte = chunk[-1:]
+    stream.seek(0)
+    lines = newlines + (1 if size and last_byte != b"\n" else 0)
+    if len(offsets) > 1 and offsets[-1] >= size:
+        # A checkpoint right after the final newline points at a line that does not exist
+        offsets.pop()
+    return LineIndex(stride, offsets, lines, size)
+
+
+def read_lines(source, index: LineIndex, start_line: int, count: int, chunk_size: int = DEFAULT_CHUNK_BYTES,
+               max_bytes: int = DEFAULT_MAX_WINDOW_BYTES) -> str:
+    """Decode only lines start_line .. start_line + count - 1 (1-based), at most max_bytes of them"""
+    stream = _as_stream(source)
+    offset, line = index.locate(start_line)
+    stream.seek(offset)
+    decoder = _decoder()
+    pieces: List[str] = []
+    collected = 0
+    remaining = count
+    while remaining > 0 and collected < max_bytes:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        position = 0
+        # Skip whole lines between the indexed line and start_line without decoding them
+        while line < start_line:
+            newline = chunk.find(b"\n", position)
+            if newline < 0:
+                position = len(chunk)
+                break
+            position = newline + 1
+            line += 1
+        if line < start_line:
+            continue
+        end = position
+        while remaining > 0:
+            newline = chunk.find(b"\n", end)
+            if newline < 0:
+                end = len(chunk)
+                break
+            end = newline + 1
+            remaining -= 1
+        piece = chunk[position:min(end, position + max_bytes - collected)]
+        collected += len(piece)
+        pieces.append(decoder.decode(piece))
+    pieces.append(decoder.decode(b"", final=True))
+    stream.seek(0)
+    return "".join(pieces)
+
+
+@dataclass
+class SearchHit:
+    line: int
+    column: int
+    preview: str
+
+
+def search_text(source, query: str, case_sensitive: bool = False, max_hits: int = 100,
+                chunk_size: int = DEFAULT_CHUNK_BYTES) -> Tuple[List[SearchHit], bool]:
+    """(hits, truncated) for a literal query, scanning decoded chunks with a len(query) - 1 overlap.
+
+    Matches do not overlap and are the same as one re.finditer over the whole text, whatever the
+    chunk size: each window resumes after the last match reported from the previous one.
+    """
+    if not query:
+        return [], False
+    pattern = re.compile(re.escape(query), 0 if case_sensitive else re.IGNORECASE)
+    stream = _as_stream(source)
+    stream.seek(0)
+    decoder = _decoder()
+    overlap = len(query) - 1
+    carry = ""
+    carry_line = 1
+    # Characters of the carry's first line that come before the window
+    carry_column = 0
+    hits: List[SearchHit] = []
+    truncated = False
+    while not truncated:
+        chunk = stream.read(chunk_size)
+        window = carry + decoder.decode(chunk, final=not chunk)
+        last_end = 0
+        # Every match found fits in the window, so none of them can be cut short by the chunking
+        for match in pattern.finditer(window):
+            if len(hits) >= max_hits:
+                truncated = True
+                break
+            line_start = window.rfind("\n", 0, match.start()) + 1
+            column = match.start() - line_start + (carry_column if line_start == 0 else 0)
+            preview = window[max(match.start() - PREVIEW_CHARS, line_start):match.end() + PREVIEW_CHARS]
+            hits.append(SearchHit(carry_line + window.count("\n", 0, match.start()), column + 1,
+                                  preview.split("\n", 1)[0]))
+            last_end = match.end()
+        if not chunk:
+            break
+        # Keep the tail a match could still start in, but never text a reported match covered
+        consumed = window[:max(last_end, len(window) - min(overlap, len(window)))]
+        last_newline = consumed.rfind("\n")
+        carry_column = len(consumed) - last_newline - 1 if last_newline >= 0 else carry_column + len(consumed)
+        carry_line += consumed.count("\n")
+        carry = window[len(consumed):]
+    stream.seek(0)
+    return hits, truncated
@@ -0,0 +1,386 @@
+# Lazy, content-hash keyed parsing of uploaded files for the file upload demos
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from text_window import build_line_index, search_text
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+TEXT_EXTENSIONS = ("txt", "py", "html", "css", "js", "md")
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "gif")
+RAW_PREVIEW_BYTES = 1000
+DEFAULT_THUMBNAIL_SIDE = 640
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_extension(name: str) -> str:
+    return name.split(".")[-1].lower()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a parse result, used for the cache budget"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if hasattr(value, "memory_bytes"):  # CsvProfile, Thumbnail, LineIndex
+        return value.memory_bytes
+    if hasattr(value, "memory_usage"):  # pandas DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return len(json.dumps(value, default=str))
+    return sys.getsizeof(value)
+
+
+@dataclass
+class ParseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ParseCache:
+    """LRU cache of parse results keyed by (content digest, what was parsed), capped in bytes.
+
+    Keys never contain the file name, so the same bytes uploaded twice (or by two sessions)
+    are parsed once. A result larger than the whole budget is returned without being stored.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = ParseCacheStats()
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[Hashable, ...]) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Tuple[Hashable, ...], value: Any, value_bytes: Optional[int] = None):
+        value_bytes = estimate_size(value) if value_bytes is None else value_bytes
+        if value_bytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, value_bytes)
+            self._bytes += value_bytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.stats.evictions += 1
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any],
+                       size: Optional[Callable[[Any], int]] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry[0]
+            self.stats.misses += 1
+        value = compute()
+        self.put(key, value, (size or estimate_size)(value))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def parse_csv(data: bytes):
+    """Streaming profile (shape, column stats, random sample) rather than the whole frame.
+
+    The same pandas profile csv_profile() computes, so both share one cache entry (see _cache_key).
+    """
+    from csv_profile import profile_csv
+    return profile_csv(data, engine="pandas")
+
+
+def parse_json(data: bytes) -> Any:
+    return json.loads(data.decode("utf-8"))
+
+
+@dataclass
+class Thumbnail:
+    data: bytes  # encoded JPEG, or PNG when the image has transparency
+    format: str
+    width: int  # of the original image, read from its header
+    height: int
+    source_format: Optional[str]
+    frames: int = 1
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def mimetype(self) -> str:
+        return f"image/{self.format.lower()}"
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """(width, height) from the image header; no pixels are decoded"""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def make_thumbnail(data: bytes, max_side: int = DEFAULT_THUMBNAIL_SIDE, quality: int = 85) -> Thumbnail:
+    """Size-capped preview that decodes as few pixels as the format allows"""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        source_format = image.format
+        frames = getattr(image, "n_frames", 1)
+        # JPEG: decode straight to 1/2, 1/4 or 1/8 scale from the DCT coefficients (no-op for other formats)
+        image.draft("RGB", (max_side, max_side))
+        # reducing_gap: shrink by an integer factor with reduce() first, then resample only the last step
+        image.thumbnail((max_side, max_side), reducing_gap=2.0)
+        # Camera images store their rotation in EXIF
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        buffer = io.BytesIO()
+        if transparent:
+            image.convert("RGBA").save(buffer, format="PNG", optimize=True)
+            thumbnail_format = "PNG"
+        else:
+            image.convert("RGB").save(buffer, format="JPEG", quality=quality)
+            thumbnail_format = "JPEG"
+    return Thumbnail(buffer.getvalue(), thumbnail_format, width, height, source_format, frames)
+
+
+PARSERS: Dict[str, Callable[[bytes], Any]] = {
+    **{extension: build_line_index for extension in TEXT_EXTENSIONS},
+    "csv": parse_csv,
+    "json": parse_json,
+    **{extension: make_thumbnail for extension in IMAGE_EXTENSIONS},
+}
+
+
+def _cache_key(digest: str, extension: str) -> Tuple:
+    if extension in IMAGE_EXTENSIONS:
+        # Same entry whatever the extension, so a .jpg and a .jpeg of one file share a thumbnail
+        return digest, "thumbnail", DEFAULT_THUMBNAIL_SIDE
+    if extension in TEXT_EXTENSIONS:
+        return digest, "line_index"
+    if extension == "csv":
+        # csv_profile's key for the pandas engine, so the CSV cards find what parse_all stored
+        return digest, "csv", "pandas"
+    return digest, extension
+
+
+def parse_upload(cache: ParseCache, name: str, data: bytes, digest: Optional[str] = None) -> Any:
+    """Parse a text, CSV, JSON or image upload by its extension; raw bytes for anything else"""
+    extension = file_extension(name)
+    parser = PARSERS.get(extension)
+    if parser is None:
+        return data[:RAW_PREVIEW_BYTES]
+    return cache.get_or_compute(_cache_key(digest or file_digest(data), extension), lambda: parser(data))
+
+
+def line_index(cache: ParseCache, data: bytes, digest: Optional[str] = None):
+    """Sparse line-offset index of a text upload; the text itself is decoded one window at a time"""
+    return cache.get_or_compute((digest or file_digest(data), "line_index"), lambda: build_line_index(data))
+
+
+def search_upload(cache: ParseCache, data: bytes, query: str, digest: Optional[str] = None):
+    """(hits, truncated) of a case-insensitive search, so reruns with the same query skip the scan"""
+    return cache.get_or_compute((digest or file_digest(data), "search", query), lambda: search_text(data, query))
+
+
+def thumbnail(cache: ParseCache, data: bytes, max_side: int = DEFAULT_THUMBNAIL_SIDE,
+              digest: Optional[str] = None) -> Thumbnail:
+    return cache.get_or_compute((digest or file_digest(data), "thumbnail", max_side),
+                                lambda: make_thumbnail(data, max_side))
+
+
+def csv_profile(cache: ParseCache, data: bytes, engine: str = "pandas", digest: Optional[str] = None,
+                progress_callback=None):
+    """Profile of a CSV upload, cached per engine since their type inference differs"""
+    from csv_profile import profile_csv
+    return cache.get_or_compute((digest or file_digest(data), "csv", engine),
+                                lambda: profile_csv(data, engine=engine, progress_callback=progress_callback))
+
+
+@dataclass
+class SharedPdf:
+    """A PdfReader shared by every session, with the lock that must be held while using it.
+
+    The reader seeks and reads one BytesIO and fills its object cache lazily, so two threads
+    extracting pages at once would corrupt each other's reads.
+    """
+    reader: Any
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def pdf_reader(cache: ParseCache, data: bytes, digest: Optional[str] = None) -> SharedPdf:
+    """PdfReader over the upload; only the cross-reference table is read until a page is asked for"""
+    from PyPDF2 import PdfReader
+    return cache.get_or_compute((digest or file_digest(data), "pdf"), lambda: SharedPdf(PdfReader(io.BytesIO(data))),
+                                size=lambda _: len(data))
+
+
+def pdf_page_count(cache: ParseCache, data: bytes, digest: Optional[str] = None) -> int:
+    digest = digest or file_digest(data)
+
+    def count() -> int:
+        pdf = pdf_reader(cache, data, digest)
+        with pdf.lock:
+            return len(pdf.reader.pages)
+
+    return cache.get_or_compute((digest, "pdf_pages"), count)
+
+
+def pdf_page_text(cache: ParseCache, data: bytes, page_number: int, digest: Optional[str] = None) -> str:
+    """Text of one 1-based page, extracted the first time that page is shown"""
+    digest = digest or file_digest(data)
+
+    def extract() -> str:
+        pdf = pdf_reader(cache, data, digest)
+        with pdf.lock:
+            return pdf.reader.pages[page_number - 1].extract_text() or ""
+
+    return cache.get_or_compute((digest, "pdf", page_number), extract)
+
+
+def extract_pdf_pages(data: bytes) -> Tuple[List[str], float]:
+    """(text of every page, seconds spent); runs in a worker process, so it only takes and returns plain data"""
+    from PyPDF2 import PdfReader
+    started = time.perf_counter()
+    pages = [page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages]
+    return pages, time.perf_counter() - started
+
+
+def _timed_parse(parser: Callable[[bytes], Any], data: bytes) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    return parser(data), time.perf_counter() - started
+
+
+@dataclass
+class ParseTiming:
+    name: str
+    size: int
+    pool: str  # "process", "thread" or "cache"
+    seconds: float
+    error: Optional[str] = None
+
+
+class ParsePool:
+    """Parses many uploads at once: PDFs in worker processes, everything else in threads.
+
+    PDF text extraction is pure Python and holds the GIL, so only processes spread it across
+    cores; CSV and image decoding release the GIL in pandas / Pillow, and their results would be
+    costly to pickle back from a process. Results go into the ParseCache the cards read from.
+    A worker that dies (e.g. out of memory) breaks the process pool; it is replaced, so only the
+    files it was parsing report an error.
+    """
+
+    def __init__(self, max_processes: Optional[int] = None, max_threads: Optional[int] = None):
+        cores = os.cpu_count() or 1
+        self._max_processes = max_processes or cores
+        self._processes = self._new_process_pool()
+        self._processes_lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=max_threads or min(32, cores + 4),
+                                           thread_name_prefix="upload-parse")
+
+    def _new_process_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a multi-threaded server process can deadlock the children
+        return ProcessPoolExecutor(max_workers=self._max_processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_broken(self, broken: ProcessPoolExecutor):
+        with self._processes_lock:
+            # Another session may already have replaced it
+            if self._processes is broken:
+                self._processes = self._new_process_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_process(self, function, *args):
+        """(future, pool it was submitted to), replacing the pool first if it is already broken"""
+        processes = self._processes
+        try:
+            return processes.submit(function, *args), processes
+        except BrokenProcessPool:
+            self._replace_broken(processes)
+            processes = self._processes
+            return processes.submit(function, *args), processes
+
+    def parse_all(self, cache: ParseCache, files: Iterable[Tuple[str, bytes]]) -> Iterator[ParseTiming]:
+        """Yield one ParseTiming per (name, data) as each file finishes, fastest first"""
+        futures = {}
+        process_pools = {}
+        for name, data in files:
+            digest = file_digest(data)
+            extension = file_extension(name)
+            if extension == "pdf":
+                key = (digest, "pdf_pages")
+                if key in cache:
+                    yield ParseTiming(name, len(data), "cache", 0.0)
+                    continue
+                try:
+                    future, processes = self._submit_process(extract_pdf_pages, data)
+                    process_pools[future] = processes
+                except BrokenProcessPool as error:
+                    yield ParseTiming(name, len(data), "process", 0.0, str(error))
+                    continue
+                futures[future] = (name, data, digest, extension, "process")
+            else:
+                parser = PARSERS.get(extension)
+                if parser is None:
+                    continue
+                if _cache_key(digest, extension) in cache:
+                    yield ParseTiming(name, len(data), "cache", 0.0)
+                    continue
+                future = self._threads.submit(_timed_parse, parser, data)
+                futures[future] = (name, data, digest, extension, "thread")
+
+        for future in as_completed(futures):
+            name, data, digest, extension, pool = futures[future]
+            try:
+                result, seconds = future.result()
+            except BrokenProcessPool as error:
+                self._replace_broken(process_pools[future])
+                yield ParseTiming(name, len(data), pool, 0.0, f"worker process died: {error}")
+                continue
+            except Exception as error:
+                yield ParseTiming(name, len(data), pool, 0.0, str(error))
+                continue
+            if extension == "pdf":
+                for page_number, text in enumerate(result, 1):
+                    cache.put((digest, "pdf", page_number), text)
+                cache.put((digest, "pdf_pages"), len(result))
+            else:
+                cache.put(_cache_key(digest, extension), result)
+            yield ParseTiming(name, len(data), pool, seconds)
+
+    def close(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._processes.shutdown(wait=False, cancel_futures=True)
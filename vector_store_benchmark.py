@@ -0,0 +1,184 @@
+# Reproducible benchmark suite for the Chroma persistent store used by 9_vector_store_demo.py
+# Examples:
+#   python vector_store_benchmark.py --sizes 10000 --output bench.json
+#   python vector_store_benchmark.py --sizes 10000,100000,1000000 --dim 384 --output bench_full.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from store_maintenance import directory_size
+
+CATEGORIES = ["science", "technology", "history", "art", "sports", "health", "travel", "food", "music", "finance"]
+WORDS = ["vector", "store", "query", "index", "token", "model", "search", "result", "memory", "latency",
+         "graph", "neighbor", "embed", "document", "python", "stream", "batch", "cache", "disk", "page"]
+COLLECTION_NAME = "benchmark_collection"
+
+# Runs in a fresh interpreter so the open really is cold (no cached client, bindings or index)
+COLD_OPEN_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import chromadb
+imported = time.perf_counter()
+client = chromadb.PersistentClient(path=sys.argv[1])
+collection = client.get_collection(sys.argv[2])
+opened = time.perf_counter()
+collection.query(query_embeddings=[[0.0] * int(sys.argv[3])], n_results=1, include=[])
+queried = time.perf_counter()
+print(json.dumps({"import_s": imported - started, "open_s": opened - imported, "first_query_s": queried - opened}))
+"""
+
+
+def synthetic_batch(start: int, count: int, dim: int, seed: int):
+    """Deterministic documents, metadata and embeddings for rows start..start+count.
+
+    Each batch has its own seed, so any size produces the same rows regardless of batch size
+    boundaries of a previous run, and no corpus is ever held in memory at once.
+    """
+    rng = np.random.default_rng([seed, start])
+    # Embeddings cluster around per-category centers, like real topic-structured text
+    centers = np.random.default_rng(seed).normal(size=(len(CATEGORIES), dim)).astype(np.float32)
+    categories = rng.integers(0, len(CATEGORIES), size=count)
+    embeddings = centers[categories] + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    word_ids = rng.integers(0, len(WORDS), size=(count, 12))
+    ids = [f"doc_{start + i}" for i in range(count)]
+    documents = [" ".join(WORDS[w] for w in row) for row in word_ids]
+    metadatas = [{"category": CATEGORIES[c], "year": int(1990 + (start + i) % 35)}
+                 for i, c in enumerate(categories)]
+    return ids, documents, metadatas, embeddings
+
+
+def percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "mean_ms": float(np.mean(latencies_ms))}
+
+
+def time_queries(collection, queries: np.ndarray, k: int, where=None) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        collection.query(query_embeddings=[query], n_results=k, where=where, include=["metadatas", "distances"])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+
+def cold_open(db_path: str, dim: int) -> Dict[str, float]:
+    output = subprocess.run([sys.executable, "-c", COLD_OPEN_SCRIPT, db_path, COLLECTION_NAME, str(dim)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def store_path(workdir: str, size: int) -> str:
+    return os.path.join(workdir, f"krish_demo_db_{size}")
+
+
+def run_size(size: int, dim: int, n_queries: int, k: int, batch_size: int, workdir: str, seed: int, log=print) -> Dict:
+    import chromadb
+
+    db_path = store_path(workdir, size)
+    shutil.rmtree(db_path, ignore_errors=True)
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.create_collection(COLLECTION_NAME)
+    batch_size = min(batch_size, client.get_max_batch_size())
+
+    log(f"📥 Ingesting {size:,} documents ({dim} dims)...")
+    ingest_seconds = 0.0
+    for start in range(0, size, batch_size):
+        ids, documents, metadatas, embeddings = synthetic_batch(start, min(batch_size, size - start), dim, seed)
+        # Only the upsert is timed; generating synthetic data is not part of the store's cost
+        started = time.perf_counter()
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        ingest_seconds += time.perf_counter() - started
+
+    queries = synthetic_batch(size + 1_000_000_000, n_queries, dim, seed)[3]
+    # Warm the index so the first query's load cost is reported by cold_open, not here
+    collection.query(query_embeddings=[queries[0]], n_results=k, include=[])
+    log("🔎 Timing queries...")
+    query_stats = time_queries(collection, queries, k)
+    filtered_stats = time_queries(collection, queries, k, where={"category": CATEGORIES[0]})
+    range_stats = time_queries(collection, queries, k, where={"year": {"$gte": 2015}})
+    del collection, client
+
+    result = {
+        "size": size,
+        "dimensions": dim,
+        "ingest_seconds": ingest_seconds,
+        "ingest_docs_per_second": size / ingest_seconds if ingest_seconds else 0.0,
+        "query": query_stats,
+        "filtered_query_equality": filtered_stats,
+        "filtered_query_range": range_stats,
+        "disk_bytes": directory_size(db_path),
+        "sqlite_bytes": os.path.getsize(os.path.join(db_path, "chroma.sqlite3")),
+        "cold_open": cold_open(db_path, dim),
+    }
+    log(f"   ingest {result['ingest_docs_per_second']:,.0f} docs/s · query p50 {query_stats['p50_ms']:.2f} ms "
+        f"p99 {query_stats['p99_ms']:.2f} ms · filtered p50 {filtered_stats['p50_ms']:.2f} ms · "
+        f"disk {result['disk_bytes'] / 1024 ** 2:,.1f} MB · cold open {result['cold_open']['open_s']:.2f}s")
+    return result
+
+
+def environment() -> Dict[str, str]:
+    import chromadb
+    return {
+        "chromadb": chromadb.__version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest, query latency, disk size and cold-open time of a Chroma store")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimensions (default matches Chroma's default model)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Where to build the stores (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated stores")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    temporary = not args.workdir
+    workdir = args.workdir or tempfile.mkdtemp(prefix="chroma_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    sizes = []
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "parameters": {"dim": args.dim, "queries": args.queries, "k": args.k,
+                       "batch_size": args.batch_size, "seed": args.seed},
+        "results": [],
+    }
+    try:
+        for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+            sizes.append(size)
+            report["results"].append(run_size(size, args.dim, args.queries, args.k, args.batch_size, workdir, args.seed))
+            # Rewrite after every size so a long run still leaves partial results
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if not args.keep:
+            # A user-supplied --workdir may hold other files, so only the stores built here are removed
+            for size in sizes:
+                shutil.rmtree(store_path(workdir, size), ignore_errors=True)
+            if temporary:
+                shutil.rmtree(workdir, ignore_errors=True)
+    print(f"💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# Background writer that coalesces adds, upserts and deletes from many sessions into batched calls
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_MAX_BATCH_ROWS = 256
+DEFAULT_MAX_DELAY = 0.05
+DEFAULT_MAX_PENDING = 1000
+KINDS = ("add", "upsert", "delete")
+
+
+@dataclass
+class WriteOp:
+    kind: str
+    collection: Any
+    ids: List[str]
+    embeddings: Optional[List] = None
+    documents: Optional[List] = None
+    metadatas: Optional[List] = None
+    future: Future = field(default_factory=Future)
+
+    @property
+    def collection_key(self):
+        # Each session holds its own Collection object, so the stable id decides what coalesces
+        return getattr(self.collection, "id", None) or self.collection.name
+
+    @property
+    def run_key(self):
+        return self.kind, self.embeddings is not None
+
+
+@dataclass
+class WriteQueueStats:
+    submitted: int = 0
+    rejected: int = 0
+    batches: int = 0
+    rows: int = 0
+    failed: int = 0
+    flush_seconds: float = 0.0
+
+    @property
+    def rows_per_batch(self) -> float:
+        return self.rows / self.batches if self.batches else 0.0
+
+
+class WriteQueue:
+    """Single writer thread for a shared client.
+
+    Writes queued within max_delay of each other (up to max_batch_rows rows) are applied together:
+    consecutive ops of the same kind on one collection become a single add/upsert/delete call,
+    in submission order per collection. submit() returns a Future that resolves to the number of
+    rows written, and blocks for up to put_timeout when max_pending writes are already waiting.
+    """
+
+    def __init__(self, max_batch_rows: int = DEFAULT_MAX_BATCH_ROWS, max_delay: float = DEFAULT_MAX_DELAY,
+                 max_pending: int = DEFAULT_MAX_PENDING, put_timeout: float = 10.0,
+                 on_flush: Optional[Callable[[str], None]] = None):
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush
+        self.stats = WriteQueueStats()
+        self._queue: "queue.Queue[Optional[WriteOp]]" = queue.Queue(maxsize=max_pending)
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="vector-store-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, kind: str, collection, ids: List[str], embeddings=None, documents=None,
+               metadatas=None) -> Future:
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        op = WriteOp(kind, collection, list(ids),
+                     None if embeddings is None else list(embeddings),
+                     None if documents is None else list(documents),
+                     None if metadatas is None else list(metadatas))
+        try:
+            # Backpressure: a full queue makes writers wait instead of growing without bound
+            self._queue.put(op, timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats.rejected += 1
+            raise RuntimeError(f"Write queue is full ({self._queue.maxsize} pending writes); try again shortly")
+        with self._stats_lock:
+            self.stats.submitted += 1
+        return op.future
+
+    def add(self, collection, ids, embeddings=None, documents=None, metadatas=None) -> Future:
+        return self.submit("add", collection, ids, embeddings, documents, metadatas)
+
+    def upsert(self, collection, ids, embeddings=None, documents=None, metadatas=None) -> Future:
+        return self.submit("upsert", collection, ids, embeddings, documents, metadatas)
+
+    def delete(self, collection, ids) -> Future:
+        return self.submit("delete", collection, ids)
+
+    def close(self, timeout: Optional[float] = None):
+        """Apply everything already queued, then stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            batch, rows, stop = [op], len(op.ids), False
+            deadline = time.monotonic() + self.max_delay
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    op = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if op is None:
+                    stop = True
+                    break
+                batch.append(op)
+                rows += len(op.ids)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch: List[WriteOp]):
+        started = time.perf_counter()
+        by_collection: "OrderedDict[Any, List[WriteOp]]" = OrderedDict()
+        for op in batch:
+            by_collection.setdefault(op.collection_key, []).append(op)
+        for ops in by_collection.values():
+            run: List[WriteOp] = []
+            for op in ops:
+                if run and op.run_key != run[0].run_key:
+                    self._apply_run(run)
+                    run = []
+                run.append(op)
+            self._apply_run(run)
+            if self.on_flush:
+                try:
+                    self.on_flush(ops[0].collection.name)
+                except Exception:
+                    pass
+        with self._stats_lock:
+            self.stats.batches += 1
+            self.stats.rows += sum(len(op.ids) for op in batch)
+            self.stats.flush_seconds += time.perf_counter() - started
+
+    def _apply_run(self, run: List[WriteOp]):
+        collection = run[0].collection
+        kind = run[0].kind
+        try:
+            if kind == "delete":
+                collection.delete(ids=list(dict.fromkeys(doc_id for op in run for doc_id in op.ids)))
+                accepted = run
+            elif kind == "add":
+                accepted = self._reject_existing(collection, run)
+                if accepted:
+                    collection.add(**self._merge(accepted))
+            else:
+                accepted = run
+                collection.upsert(**self._merge(run))
+        except Exception as error:
+            for op in run:
+                if not op.future.done():
+                    op.future.set_exception(error)
+            with self._stats_lock:
+                self.stats.failed += len(run)
+            return
+        for op in accepted:
+            op.future.set_result(len(op.ids))
+
+    def _reject_existing(self, collection, run: List[WriteOp]) -> List[WriteOp]:
+        """Fail the adds whose ids already exist, so one duplicate cannot fail the whole batch"""
+        all_ids = [doc_id for op in run for doc_id in op.ids]
+        taken = set(collection.get(ids=all_ids, include=[])["ids"])
+        accepted = []
+        for op in run:
+            clashes = [doc_id for doc_id in op.ids if doc_id in taken]
+            if clashes or len(set(op.ids)) != len(op.ids):
+                op.future.set_exception(ValueError(f"IDs already exist: {', '.join(clashes[:5]) or 'duplicated in the request'}"))
+                with self._stats_lock:
+                    self.stats.failed += 1
+                continue
+            taken.update(op.ids)
+            accepted.append(op)
+        return accepted
+
+    @staticmethod
+    def _merge(ops: List[WriteOp]) -> Dict[str, Any]:
+        """One add/upsert payload; for a repeated id the latest op wins"""
+        rows: "OrderedDict[str, tuple]" = OrderedDict()
+        for op in ops:
+            for index, doc_id in enumerate(op.ids):
+                rows.pop(doc_id, None)
+                rows[doc_id] = (
+                    op.embeddings[index] if op.embeddings is not None else None,
+                    op.documents[index] if op.documents is not None else None,
+                    op.metadatas[index] if op.metadatas is not None else None,
+                )
+        values = list(rows.values())
+        payload = {"ids": list(rows)}
+        if ops[0].embeddings is not None:
+            payload["embeddings"] = [row[0] for row in values]
+        documents = [row[1] for row in values]
+        metadatas = [row[2] for row in values]
+        if any(document is not None for document in documents):
+            payload["documents"] = documents
+        # Chroma rejects empty metadata dicts, so rows without metadata stay None
+        if any(metadatas):
+            payload["metadatas"] = metadatas
+        return payload